@@ -1,36 +1,99 @@
 import streamlit as st
 from streamlit.runtime.uploaded_file_manager import UploadedFile
 from pathlib import Path
-from postermakerClass import PostMaker, EventInformation, PostInformation, Posts
-from os import path
+from postermakerClass import PostMaker, EventInformation, FontInfo, PostInformation, PosterAssets, Posts, RenderedPoster, RenderOptions, TextFit, PREVIEW_SCALE, font_index
+from upload_store import UploadStore
+from io import BytesIO
 
 
-def display_generated_image(generated_posters_path: Path):
+@st.cache_resource
+def get_postmaker() -> PostMaker:
+    # PostMaker keeps no per-render state, so every session can share one
+    return PostMaker()
 
-    extensions = {".png", ".jpg", ".jpeg", ".webm"}
-    files = [f for f in generated_posters_path.iterdir() if f.suffix.lower()
-             in extensions]
 
-    if files:
-        latest_file = max(files, key=lambda f: f.stat().st_mtime)
-        st.image(str(latest_file), caption="Üretilen Posteriniz")
-    else:
-        st.warning("No images found in the directory.")
+@st.cache_resource
+def get_upload_store() -> UploadStore:
+    return UploadStore(Path("__file__").parent / "file_uploads")
 
 
-def save_file(file: UploadedFile, directory: str) -> None:
-    save_path: Path = Path("__file__").parent / directory
-    save_path.mkdir(exist_ok=True)
-    file_path = save_path / file.name
+@st.cache_resource(max_entries=8)
+def get_assets(background: str, logo: str, qr: str) -> PosterAssets:
+    """
+    Upload paths are content hashes, so the assets never go stale. Kept across renders,
+    a repeat render with the same images decodes and resizes nothing.
+    """
+    return get_postmaker()._load_assets(Path(background), Path(logo), qr)
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def render_poster(canvas: tuple[int, int, int, int, int], bgcolor: str, fgcolor: str,
+                  texts: tuple[tuple[str, str, int], ...], qr: str,
+                  background: str, logo: str, text_fit: str) -> RenderedPoster:
+    """
+    Memoized on the input values. Upload paths are content hashes, a changed file has another path.
+    """
+    title, desc, date, place = texts
+    event_information = EventInformation(
+        title=title, desc=desc, date=date, place=place)
+    return get_postmaker()._render_bytes(PostInformation(*canvas), bgcolor, fgcolor, event_information,
+                                         get_assets(background, logo, qr), RenderOptions(text_fit=TextFit(text_fit)))
+
+
+@st.cache_data(max_entries=128, show_spinner=False)
+def render_preview(canvas: tuple[int, int, int, int, int], bgcolor: str, fgcolor: str,
+                   texts: tuple[tuple[str, str, int], ...], qr: str,
+                   background: str | None, logo: str | None, text_fit: str) -> bytes:
+    """
+    Quarter scale Pillow render, no PDF and no poppler involved.
+    """
+    title, desc, date, place = texts
+    event_information = EventInformation(
+        title=title, desc=desc, date=date, place=place)
+    image = get_postmaker().preview(PostInformation(*canvas), bgcolor, fgcolor, event_information, qr,
+                                    Path(background) if background else None,
+                                    Path(logo) if logo else None, text_fit=TextFit(text_fit))
+    buffer = BytesIO()
+    image.save(buffer, "PNG", compress_level=1)
+    return buffer.getvalue()
+
+
+def display_generated_image(poster: RenderedPoster):
+    st.image(poster.image, caption="Üretilen Posteriniz")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button("PNG İndir", poster.image,
+                           f"{poster.file_name}.png", "image/png")
+    if poster.pdf:
+        with col2:
+            st.download_button("PDF İndir", poster.pdf,
+                               f"{poster.file_name}.pdf", "application/pdf")
+
 
-    if not path.isfile(file_path):
-        print(
-            f"Saved {file.name} to {save_path}")
-        with open(file_path, "wb") as f:
-            f.write(file.getvalue())
+def store_upload(label: str) -> str | None:
+    """
+    Content hash of the file uploaded with label. Each upload is stored once,
+    and again only if the store evicted it in the meantime.
+    """
+    file: UploadedFile | None = st.session_state[label]
+    if not file:
+        return None
+    stored = st.session_state.get(label + "_stored")
+    if not stored or stored[0] != file.file_id or get_upload_store().get(stored[1]) is None:
+        stored = (file.file_id, get_upload_store().put(file))
+        st.session_state[label + "_stored"] = stored
+    return stored[1]
+
+
+def upload_path(label: str, size: float) -> Path | None:
+    """
+    The stored copy of the upload that is just large enough for a canvas whose long side is size.
+    """
+    digest = store_upload(label)
+    return get_upload_store().get(digest, size) if digest else None
 
 
-def upload_image(label: str, upload_desc: str, display_desc, file_directory_name: str) -> None:
+def upload_image(label: str, upload_desc: str, display_desc) -> None:
     st.file_uploader(
         upload_desc,
         ["webm", "jpg", "jpeg", "png"],
@@ -39,22 +102,35 @@ def upload_image(label: str, upload_desc: str, display_desc, file_directory_name
     )
 
     if st.session_state[label]:
-        save_file(st.session_state[label], file_directory_name)
+        store_upload(label)
         st.image(st.session_state[label],
                  caption=display_desc)
         st.session_state[label + "_prev"] = st.session_state[label]
 
 
-def get_fonts() -> dict[str, Path] | None:
+@st.cache_resource(ttl=5, show_spinner=False)
+def get_font_infos() -> dict[str, FontInfo] | None:
+    """
+    Every font file in the Fonts folder by file name. The index only parses new or changed files,
+    so rescanning every few seconds is cheap and added fonts show up without a restart.
+    """
     fonts_path: Path = Path("__file__").parent / "Fonts"
-    if fonts_path.exists():
-        fonts: dict[str, Path] = {}
-        for font in fonts_path.iterdir():
-            if font.is_file():
-                fonts[font.name] = font.resolve()
-    else:
+    if not fonts_path.exists():
+        return None
+    return {Path(info.path).name: info for info in font_index(fonts_path).scan()}
+
+
+def get_fonts() -> dict[str, Path] | None:
+    infos = get_font_infos()
+    if infos is None:
         return None
-    return fonts
+    return {name: Path(info.path) for name, info in infos.items() if info.valid}
+
+
+def show_font_errors() -> None:
+    for name, info in (get_font_infos() or {}).items():
+        if not info.valid:
+            st.warning(f"{name} kullanılamıyor: {info.error}")
 
 
 def text_input(label: str, title: str, size_value: int = 1) -> None:
@@ -82,10 +158,91 @@ def text_input(label: str, title: str, size_value: int = 1) -> None:
         if not fonts:
             st.error("No fonts were found in the Fonts folder!")
         else:
+            infos = get_font_infos()
             st.selectbox(
                 "Fontlar",
                 fonts.keys(),
+                format_func=lambda name: f"{infos[name].label} ({name})",
                 key=label+"_font")
+            info = infos.get(st.session_state[label+"_font"])
+            missing = info.missing(st.session_state[label+"_content"]) if info else ""
+            if missing:
+                st.caption(f"Bu fontta olmayan karakterler: {missing}")
+
+
+def get_event_information(fonts: dict[str, Path]) -> EventInformation:
+    ss = st.session_state
+    return EventInformation(
+        title=(
+            ss.title_content,
+            str(fonts[ss.title_font].absolute()),
+            ss.title_size_int
+        ),
+        desc=(
+            ss.description_content,
+            str(fonts[ss.description_font].absolute()),
+            ss.description_size_int
+        ),
+        date=(
+            ss.date_content,
+            str(fonts[ss.date_font].absolute()),
+            ss.date_size_int
+        ),
+        place=(
+            ss.place_content,
+            str(fonts[ss.place_font].absolute()),
+            ss.place_size_int
+        )
+    )
+
+
+def get_canvas() -> tuple[int, int, int, int, int]:
+    ss = st.session_state
+    return (
+        ss.poster_width_int,
+        ss.poster_height_int,
+        ss.text_padding_int,
+        ss.x_padding_int,
+        ss.y_padding_int
+    )
+
+
+def get_text_fit() -> str:
+    return (TextFit.AUTO if st.session_state.auto_fit else TextFit.FIXED).value
+
+
+def show_preview():
+    """
+    Runs on every rerun. Streamlit stops a running script when a newer widget change arrives,
+    so a burst of edits only finishes the preview of the last one.
+    """
+    ss = st.session_state
+    fonts = get_fonts()
+    with st.sidebar:
+        st.subheader("Önizleme")
+        if not fonts:
+            return
+        event_information = get_event_information(fonts)
+        texts = (event_information.title, event_information.desc,
+                 event_information.date, event_information.place)
+        if not all(text for text, _, _ in texts):
+            st.info("Önizleme için tüm yazı alanlarını doldurun.")
+            return
+        canvas = get_canvas()
+        size = max(canvas[0], canvas[1]) * PREVIEW_SCALE
+        background = upload_path("background_image", size)
+        logo = upload_path("logo", size)
+        png = render_preview(
+            canvas,
+            ss.bgcolor,
+            ss.fgcolor,
+            texts,
+            ss.qr_code,
+            str(background.absolute()) if background else None,
+            str(logo.absolute()) if logo else None,
+            get_text_fit()
+        )
+        st.image(png, caption="Önizleme (1/4 ölçek)")
 
 
 def execute_script():
@@ -98,51 +255,29 @@ def execute_script():
         if "_int" in str(key) and value and int(value) < 0:
             st.error(f"{value} 0'dan küçük olamaz!")
 
-    postmaker = PostMaker()
     ss = st.session_state
     fonts = get_fonts()
     if fonts:
-        event_information = EventInformation(
-            title=(
-                ss.title_content,
-                str(fonts[ss.title_font].absolute()),
-                ss.title_size_int
-            ),
-            desc=(
-                ss.description_content,
-                str(fonts[ss.description_font].absolute()),
-                ss.description_size_int
-            ),
-            date=(
-                ss.date_content,
-                str(fonts[ss.date_font].absolute()),
-                ss.date_size_int
-            ),
-            place=(
-                ss.place_content,
-                str(fonts[ss.place_font].absolute()),
-                ss.place_size_int
-            )
-        )
+        event_information = get_event_information(fonts)
         if ss.background_image and ss.logo:
+            canvas = get_canvas()
+            background = upload_path("background_image", max(canvas[0], canvas[1]))
+            logo = upload_path("logo", max(canvas[0], canvas[1]))
             with st.spinner("Posteriniz oluşturuluyor...", show_time=True):
-                postmaker.create(
-                    PostInformation(
-                        ss.poster_width_int,
-                        ss.poster_height_int,
-                        ss.text_padding_int,
-                        ss.x_padding_int,
-                        ss.y_padding_int
-                    ),
+                poster = render_poster(
+                    canvas,
                     ss.bgcolor,
                     ss.fgcolor,
-                    event_information,
+                    (event_information.title, event_information.desc,
+                     event_information.date, event_information.place),
                     ss.qr_code,
-                    ss.background_image,
-                    ss.logo,
-                    str(save_path.absolute())
+                    str(background.absolute()),
+                    str(logo.absolute()),
+                    get_text_fit()
                 )
-                display_generated_image(save_path.absolute())
+                (save_path / f"{poster.file_name}.png").write_bytes(poster.image)
+                (save_path / f"{poster.file_name}.pdf").write_bytes(poster.pdf)
+                display_generated_image(poster)
                 st.success(
                     f"Dosya {save_path.absolute()} adresine kaydedildi. Dosyanın PDF'ine aynı klasörden ulaşabilirsiniz. ")
     return
@@ -151,6 +286,7 @@ def execute_script():
 if __name__ == "__main__":
 
     st.title("Poster Yapıcı")
+    show_font_errors()
 
     text_input("title", "Başlık", 200)
     text_input("description", "Açıklama", 90)
@@ -168,15 +304,13 @@ if __name__ == "__main__":
     upload_image(
         "background_image",
         "Arka Plan Resmi Yükleyin",
-        "Yüklenen Arka Plan Resmi",
-        "file_uploads"
+        "Yüklenen Arka Plan Resmi"
     )
 
     upload_image(
         "logo",
         "Logo Yükleyin",
-        "Yüklenen Logo",
-        "file_uploads"
+        "Yüklenen Logo"
     )
 
     st.number_input(
@@ -219,5 +353,13 @@ if __name__ == "__main__":
         step=1
     )
 
+    st.checkbox(
+        "Yazıları posteri taşırmayacak şekilde otomatik sığdır",
+        key="auto_fit",
+        help="Yazılar satırlara bölünür ve sığana kadar küçültülür. Girilen font boyutları üst sınır olur."
+    )
+
+    show_preview()
+
     if st.button("Posteri Oluştur"):
         execute_script()
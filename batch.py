@@ -0,0 +1,157 @@
+import csv
+import json
+from argparse import ArgumentParser, Namespace
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from time import perf_counter
+from main import apply_spec, build_parser, check_fonts, get_canvas_types, get_max_memory, get_output_options
+from postermakerClass import EventInformation, Backend, Gradient, PosterAssets, RenderOptions, TextFit, FONTS_DIRECTORY
+import worker
+
+# Columns use the same names as main.py's long options (title, title_font, bgcolor, canvas, ...)
+FONT_COLUMNS = ("title_font", "description_font", "date_font", "place_font")
+
+
+def read_manifest(manifest: Path) -> list[tuple[str, dict]]:
+    ''' Returns (row id, row) pairs. Rows without an "id" column are identified by their line number.'''
+    if manifest.suffix.lower() == ".csv":
+        with open(manifest, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+    else:
+        with open(manifest, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+    return [(str(row.get("id") or index), row) for index, row in enumerate(rows, start=1)]
+
+
+def read_status(status_file: Path) -> dict[str, dict]:
+    statuses: dict[str, dict] = {}
+    if status_file.exists():
+        with open(status_file, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    status = json.loads(line)
+                except json.JSONDecodeError:
+                    # The last line may be cut off if the previous run was killed
+                    continue
+                statuses[status["row"]] = status
+    return statuses
+
+
+def row_to_args(row: dict, backend: str = "pdf") -> Namespace:
+    ''' main.py's options with the row's values, backend is used when the row leaves it empty.'''
+    return apply_spec(build_parser().parse_args(["--backend", backend]), row)
+
+
+def _get_assets(args: Namespace) -> PosterAssets:
+    return worker.get_assets((args.background, args.logo, args.qr),
+                             Path(args.background) if args.background else None,
+                             Path(args.logo) if args.logo else None,
+                             args.qr)
+
+
+def _render_row(row_id: str, args: Namespace, savedir: str) -> dict:
+    ''' Renders a row whose fonts check_fonts already resolved.'''
+    start = perf_counter()
+    try:
+        event_information = EventInformation(
+            title=(args.title, args.title_font, args.title_size),
+            desc=(args.description, args.description_font,
+                  args.description_size),
+            date=(args.date, args.date_font, args.date_size),
+            place=(args.place, args.place_font, args.place_size),
+        )
+        assets = _get_assets(args)
+        Path(savedir).mkdir(parents=True, exist_ok=True)
+        files = []
+        for _, info, label in worker.postmaker._get_variants(get_canvas_types(args)):
+            files.append(worker.postmaker._render(info, args.bgcolor, args.fgcolor,
+                                            event_information, assets, savedir,
+                                            RenderOptions(Backend(args.backend), Gradient(args.gradient), get_output_options(args),
+                                                          TextFit(args.text_fit), get_max_memory(args)), label))
+    except Exception as e:
+        return {"row": row_id, "status": "failed", "error": str(e), "seconds": perf_counter() - start}
+    return {"row": row_id, "status": "done", "files": files, "seconds": perf_counter() - start}
+
+
+def main(args: Namespace):
+    manifest = Path(args.manifest)
+    status_file = Path(args.status) if args.status else manifest.with_suffix(".status.jsonl")
+    rows = read_manifest(manifest)
+    statuses = read_status(status_file)
+
+    pending = [(row_id, row) for row_id, row in rows
+               if statuses.get(row_id, {}).get("status") != "done"]
+    print(f"{len(rows)} satırdan {len(rows) - len(pending)} tanesi zaten tamamlanmış, "
+          f"{len(pending)} satır oluşturulacak.")
+    if not pending:
+        return
+
+    failed = 0
+    with open(status_file, "a", encoding="utf-8") as status:
+        def report(result: dict) -> None:
+            nonlocal failed
+            if result["status"] != "done":
+                failed += 1
+                print(f"{result['row']}: HATA ({result['error']})")
+            else:
+                print(f"{result['row']}: {len(result['files'])} dosya ({result['seconds']:.2f} sn)")
+            status.write(json.dumps(result, ensure_ascii=False) + "\n")
+            status.flush()
+
+        # Font names are resolved and broken fonts rejected before any row starts rendering
+        checked = []
+        for row_id, row in pending:
+            try:
+                checked.append((row_id, check_fonts(row_to_args(row, args.backend), FONTS_DIRECTORY)))
+            except Exception as e:
+                report({"row": row_id, "status": "failed", "error": str(e)})
+        fonts = sorted({getattr(row_args, column) for _, row_args in checked for column in FONT_COLUMNS})
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=worker.init_worker,
+                                 initargs=(fonts,)) as executor:
+            futures = {executor.submit(_render_row, row_id, row_args, args.savedir): row_id
+                       for row_id, row_args in checked}
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {"row": futures[future], "status": "failed", "error": str(e)}
+                report(result)
+
+    print(f"Bitti. {len(pending) - failed} başarılı, {failed} hatalı. Durum dosyası: {status_file}")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(
+        description="CSV veya JSONL dosyasındaki etkinlikler için toplu post hazırlayıcı.")
+    parser.add_argument(
+        "manifest",
+        type=str,
+        help="Etkinlikleri içeren .csv ya da .jsonl dosyası. Sütun isimleri main.py'nin seçenekleriyle aynıdır."
+    )
+    parser.add_argument(
+        "--savedir", "-sd",
+        type=str,
+        default=".",
+        help="Dosyaların kaydedileceği yer"
+    )
+    parser.add_argument(
+        "--status", "-s",
+        type=str,
+        help="İlerleme dosyası. Varsayılan: <manifest>.status.jsonl"
+    )
+    parser.add_argument(
+        "--backend", "-b",
+        type=str,
+        default="pdf",
+        choices=[backend.value for backend in Backend],
+        help="Çizim altyapısı, backend sütunu boş olan satırlar için. 'pillow' PDF üretmeden doğrudan PNG kaydeder."
+    )
+    parser.add_argument(
+        "--workers", "-j",
+        type=int,
+        help="Kullanılacak işlemci sayısı. Varsayılan: çekirdek sayısı"
+    )
+    args = parser.parse_args()
+    main(args)
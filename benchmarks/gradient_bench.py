@@ -0,0 +1,74 @@
+''' Compares the old per-row ImageDraw gradient with the numpy gradients for every Posts size.
+
+Run from the repository root:
+    python -m benchmarks.gradient_bench
+'''
+from time import perf_counter
+from PIL import Image, ImageDraw
+from postermakerClass import (GRADIENT_EASE, PillowCanvas, Posts, _create_cubic_bezier,
+                              _gradient_alpha, _gradient_image, _gradient_mask)
+
+REPEATS = 5
+COLOR = (235, 64, 52)
+
+
+def legacy_gradient(width: int, height: int) -> Image.Image:
+    # The implementation before the numpy rewrite
+    gradient_image = Image.new("RGBA", (width, height))
+    draw = ImageDraw.Draw(gradient_image)
+    ease = _create_cubic_bezier(*GRADIENT_EASE)
+    for i in range(height+1):
+        p = 1 - (i/height)
+        alpha = int(255 * ease(p))
+        draw.line([(0, i), (width, i)], fill=(*COLOR, alpha))
+    return gradient_image
+
+
+def gradient_heights(canvas_type: Posts) -> list[int]:
+    # The same two fades _place_elements draws
+    info = canvas_type.value
+    fade_length = int(info.height * 0.6)
+    return [fade_length - info.y_padding] * 2
+
+
+def timed(function) -> float:
+    best = float("inf")
+    for _ in range(REPEATS):
+        _gradient_alpha.cache_clear()
+        _gradient_mask.cache_clear()
+        _gradient_image.cache_clear()
+        start = perf_counter()
+        function()
+        best = min(best, perf_counter() - start)
+    return best
+
+
+def main():
+    print(f"{'canvas':<10}{'size':>11}{'legacy':>10}{'numpy':>10}{'cached':>10}{'blend':>10}{'speedup':>9}")
+    for canvas_type in Posts:
+        info = canvas_type.value
+        heights = gradient_heights(canvas_type)
+        size = (info.width, info.height)
+
+        legacy = timed(lambda: [legacy_gradient(info.width, h) for h in heights])
+        numpy = timed(lambda: [_gradient_image(COLOR, (info.width, h), GRADIENT_EASE, flip)
+                               for h, flip in zip(heights, (False, True))])
+
+        [_gradient_image(COLOR, (info.width, h), GRADIENT_EASE, flip)
+         for h, flip in zip(heights, (False, True))]
+        start = perf_counter()
+        [_gradient_image(COLOR, (info.width, h), GRADIENT_EASE, flip)
+         for h, flip in zip(heights, (False, True))]
+        cached = perf_counter() - start
+
+        canvas = PillowCanvas(size)
+        blend = timed(lambda: [canvas.drawGradient(COLOR, _gradient_mask((info.width, h), GRADIENT_EASE, flip), 0, info.y_padding)
+                               for h, flip in zip(heights, (False, True))])
+
+        print(f"{canvas_type.name:<10}{info.width:>5}x{info.height:<5}"
+              f"{legacy*1000:>8.1f}ms{numpy*1000:>8.1f}ms{cached*1000:>8.3f}ms{blend*1000:>8.1f}ms"
+              f"{legacy/numpy:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
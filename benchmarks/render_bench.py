@@ -0,0 +1,262 @@
+''' Times every stage of the renderer for a fixed set of synthetic events, on every Posts size and a few
+custom sizes. Each case runs in its own process: one cold render, then the warm repeats.
+
+Run from the repository root:
+    python -m benchmarks.render_bench --output baseline.json
+    python -m benchmarks.render_bench --compare baseline.json
+'''
+import json
+import platform
+import resource
+import sys
+from argparse import ArgumentParser, Namespace
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from statistics import median
+from tempfile import TemporaryDirectory
+from time import perf_counter
+import numpy as np
+from PIL import Image
+import postermakerClass
+from postermakerClass import Backend, EventInformation, Gradient, PostInformation, PostMaker, Posts, RenderOptions
+
+CUSTOM_SIZES = {
+    "SQUARE_S": PostInformation(width=800, height=800, text_padding=40, x_padding=0, y_padding=0),
+    "A4_150DPI": PostInformation(width=1240, height=1754, text_padding=55, x_padding=60, y_padding=80),
+    "IG_POST_2X": PostInformation(width=2160, height=2700, text_padding=110, x_padding=0, y_padding=270),
+}
+EVENTS = {
+    "short": ("Kodlama Gecesi", "Herkes davetli", "12 Mart 19:00", "B Blok"),
+    "long": ("Bahar Şenliği ve\nTopluluk Tanışma Günü",
+             "Konuşmalar, atölyeler ve sürpriz konuklar.\nKayıt gerekmez, herkes davetli.\nİkram olacak.",
+             "Cumartesi, 12 Nisan 2025 - 14:00",
+             "Merkez Kampüs\nKültür Merkezi Salon 2"),
+}
+BACKGROUND_SIZE = (3000, 4000)
+LOGO_SIZE = (600, 600)
+# A stage is a regression when it is this much slower than the baseline ...
+DEFAULT_THRESHOLD = 0.10
+# ... and the difference is larger than timer noise
+NOISE_FLOOR_MS = 2.0
+
+
+def _rusage() -> tuple[float, int]:
+    ''' CPU seconds of this process and its children (poppler), peak RSS in kB.'''
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime, own.ru_maxrss
+
+
+class StageTimer():
+    def __init__(self):
+        self.stages: dict[str, dict[str, float]] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start_cpu, start_rss = _rusage()
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            wall = perf_counter() - start
+            cpu, rss = _rusage()
+            self.stages[name] = {"wall_ms": wall * 1000,
+                                 "cpu_ms": (cpu - start_cpu) * 1000,
+                                 "rss_growth_kb": rss - start_rss}
+
+
+class TimedPostMaker(PostMaker):
+    ''' Wraps every stage _render goes through.'''
+
+    def __init__(self, timer: StageTimer):
+        super().__init__()
+        self.timer = timer
+        self._gradients = 0
+
+    def _place_elements(self, *args, **kwargs):
+        self._gradients = 0
+        return super()._place_elements(*args, **kwargs)
+
+    def _place_bg_image(self, *args, **kwargs):
+        with self.timer.stage("background"):
+            return super()._place_bg_image(*args, **kwargs)
+
+    def _apply_gradient(self, *args, **kwargs):
+        # _place_elements draws the foreground fade first
+        name = ("gradient_fg", "gradient_bg")[min(self._gradients, 1)]
+        self._gradients += 1
+        with self.timer.stage(name):
+            return super()._apply_gradient(*args, **kwargs)
+
+    def _layout(self, *args, **kwargs):
+        with self.timer.stage("layout"):
+            return super()._layout(*args, **kwargs)
+
+    def _write_event_info(self, *args, **kwargs):
+        with self.timer.stage("text"):
+            return super()._write_event_info(*args, **kwargs)
+
+    def _place_logo(self, *args, **kwargs):
+        with self.timer.stage("logo"):
+            return super()._place_logo(*args, **kwargs)
+
+    def _save_pdf(self, *args, **kwargs):
+        with self.timer.stage("save"):
+            return super()._save_pdf(*args, **kwargs)
+
+    def _encode(self, *args, **kwargs):
+        with self.timer.stage("encode"):
+            return super()._encode(*args, **kwargs)
+
+
+def _timed(timer: StageTimer, name: str, function):
+    def timed(*args, **kwargs):
+        with timer.stage(name):
+            return function(*args, **kwargs)
+    return timed
+
+
+def make_assets(directory: Path) -> tuple[Path, Path]:
+    ''' A noisy photo-like JPEG and a transparent PNG logo, the same on every run.'''
+    rng = np.random.default_rng(0)
+    small = rng.integers(0, 256, (BACKGROUND_SIZE[1] // 50, BACKGROUND_SIZE[0] // 50, 3), dtype=np.uint8)
+    background = Image.fromarray(small).resize(BACKGROUND_SIZE, Image.BICUBIC)
+    background_path = directory / "background.jpg"
+    background.save(background_path, quality=90)
+
+    logo = Image.new("RGBA", LOGO_SIZE, (0, 0, 0, 0))
+    logo.paste((40, 90, 200, 255), (LOGO_SIZE[0] // 4, LOGO_SIZE[1] // 4, LOGO_SIZE[0] * 3 // 4, LOGO_SIZE[1] * 3 // 4))
+    logo_path = directory / "logo.png"
+    logo.save(logo_path)
+    return background_path, logo_path
+
+
+def _run_case(canvas_type: PostInformation, event: tuple[str, str, str, str], font: str,
+              background: Path, logo: Path, savedir: str, options: RenderOptions, repeats: int) -> dict:
+    timer = StageTimer()
+    postmaker = TimedPostMaker(timer)
+    # save_image looks the converter up on the module. Each case runs in its own process, the patch ends with it.
+    postermakerClass.convert_from_path = _timed(timer, "poppler", postermakerClass.convert_from_path)
+    title, desc, date, place = event
+    event_information = EventInformation(title=(title, font, 100), desc=(desc, font, 54),
+                                         date=(date, font, 60), place=(place, font, 75))
+
+    def render() -> dict[str, dict[str, float]]:
+        timer.stages = {}
+        # Warm runs measure the stages themselves, not the layer cache
+        postermakerClass.layer_cache.clear()
+        with timer.stage("total"):
+            with timer.stage("load"):
+                assets = postmaker._load_assets(background, logo, "https://example.com/etkinlik")
+            postmaker._render(canvas_type, "#ffffff", "#eb4034", event_information, assets, savedir, options)
+        return timer.stages
+
+    cold = render()
+    warm = [render() for _ in range(repeats)]
+    stages = {name: {metric: median(run[name][metric] for run in warm) for metric in ("wall_ms", "cpu_ms")}
+              for name in warm[0]}
+    for name, values in stages.items():
+        values["cold_wall_ms"] = cold[name]["wall_ms"]
+        values["rss_growth_kb"] = cold[name]["rss_growth_kb"]
+    return {"stages": stages, "peak_rss_kb": _rusage()[1]}
+
+
+def run(args: Namespace) -> dict:
+    options = RenderOptions(Backend(args.backend), Gradient(args.gradient))
+    canvases = {canvas_type.name: canvas_type.value for canvas_type in Posts}
+    canvases.update(CUSTOM_SIZES)
+    results = []
+    with TemporaryDirectory() as directory:
+        background, logo = make_assets(Path(directory))
+        for canvas_name, canvas_type in canvases.items():
+            for event_name, event in EVENTS.items():
+                case = f"{canvas_name}/{event_name}"
+                # A fresh process per case keeps caches and peak memory from leaking between cases
+                with ProcessPoolExecutor(max_workers=1) as executor:
+                    try:
+                        result = executor.submit(_run_case, canvas_type, event, args.font, background, logo,
+                                                 directory, options, args.repeats).result()
+                    except Exception as e:
+                        result = {"error": f"{type(e).__name__}: {e}"}
+                result = {"case": case, "size": [canvas_type.width, canvas_type.height], **result}
+                results.append(result)
+                if "error" in result:
+                    print(f"{case:<22} HATA ({result['error']})")
+                else:
+                    total = result["stages"]["total"]
+                    print(f"{case:<22} {total['wall_ms']:>8.1f}ms wall {total['cpu_ms']:>8.1f}ms cpu "
+                          f"{result['peak_rss_kb'] / 1024:>7.1f}MB peak")
+    return {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "backend": args.backend,
+            "gradient": args.gradient,
+            "repeats": args.repeats,
+        },
+        "results": results,
+    }
+
+
+def compare(report: dict, baseline: dict, threshold: float, noise_floor_ms: float = NOISE_FLOOR_MS) -> list[str]:
+    ''' Returns a line for every stage whose warm wall time regressed against the baseline.'''
+    old_results = {result["case"]: result for result in baseline["results"] if "stages" in result}
+    regressions = []
+    for result in report["results"]:
+        old = old_results.get(result["case"])
+        if old is None or "stages" not in result:
+            continue
+        for name, values in result["stages"].items():
+            if name not in old["stages"]:
+                continue
+            before, after = old["stages"][name]["wall_ms"], values["wall_ms"]
+            if after > before * (1 + threshold) and after - before > noise_floor_ms:
+                regressions.append(f"{result['case']:<22} {name:<12} {before:>8.1f}ms -> {after:>8.1f}ms "
+                                   f"(+{(after / before - 1) * 100:.0f}%)")
+    return regressions
+
+
+def default_font() -> str | None:
+    fonts = sorted(Path("Fonts").glob("*.ttf")) if Path("Fonts").is_dir() else []
+    return str(fonts[0].absolute()) if fonts else None
+
+
+def main(args: Namespace):
+    if not args.font:
+        sys.exit("Font bulunamadı, --font ile bir .ttf dosyası verin.")
+    report = run(args)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Rapor kaydedildi: {args.output}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} yavaşlama bulundu:")
+            print("\n".join(regressions))
+            sys.exit(1)
+        print("Yavaşlama yok.")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Post hazırlayıcının aşama aşama performans ölçümü.")
+    parser.add_argument("--font", "-f", type=str, default=default_font(),
+                        help="Kullanılacak .ttf dosyası. Varsayılan: Fonts/ klasöründeki ilk font")
+    parser.add_argument("--backend", "-b", type=str, default="pdf",
+                        choices=[backend.value for backend in Backend])
+    parser.add_argument("--gradient", "-g", type=str, default="raster",
+                        choices=[gradient.value for gradient in Gradient])
+    parser.add_argument("--repeats", "-r", type=int, default=3,
+                        help="Her durum için ısınmadan sonraki tekrar sayısı")
+    parser.add_argument("--output", "-o", type=str,
+                        help="JSON raporun kaydedileceği dosya")
+    parser.add_argument("--compare", "-c", type=str,
+                        help="Karşılaştırılacak eski JSON rapor")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Yavaşlama sayılacak oran (0.10 = %%10)")
+    main(parser.parse_args())
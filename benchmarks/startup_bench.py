@@ -0,0 +1,104 @@
+''' Times how long the CLI takes to start, each case in a fresh interpreter: importing postermakerClass,
+`main.py --help` and a run that stops at argument validation. Also lists the heavy dependencies every case
+ends up importing, those should only be loaded by the code paths that need them.
+
+Run from the repository root:
+    python -m benchmarks.startup_bench --output startup.json
+    python -m benchmarks.startup_bench --compare startup.json
+'''
+import json
+import platform
+import subprocess
+import sys
+from argparse import ArgumentParser, Namespace
+from datetime import datetime
+from statistics import median
+from time import perf_counter
+from benchmarks.render_bench import DEFAULT_THRESHOLD, compare
+
+# Interpreter startup alone, the floor for every case
+PYTHON = ["-c", "pass"]
+CASES = {
+    "import": ["-c", "import postermakerClass"],
+    "help": ["main.py", "--help"],
+    "invalid": ["main.py", "--background", "olmayan_dosya.png"],
+}
+HEAVY_MODULES = ("PIL", "numpy", "reportlab", "qrcode", "pdf2image", "multiprocessing")
+# Starting a process varies by more than a render stage does, a new heavy import costs more than this
+STARTUP_NOISE_MS = 15.0
+
+
+def _loaded_modules(arguments: list[str]) -> list[str]:
+    ''' Heavy top-level packages imported by the case, read from -X importtime.'''
+    stderr = subprocess.run([sys.executable, "-X", "importtime", *arguments],
+                            capture_output=True, text=True).stderr
+    modules = {line.split("|")[-1].strip().split(".")[0] for line in stderr.splitlines()
+               if line.startswith("import time:")}
+    return sorted(modules & set(HEAVY_MODULES))
+
+
+def _time_case(arguments: list[str], repeats: int) -> list[float]:
+    times = []
+    for _ in range(repeats):
+        start = perf_counter()
+        subprocess.run([sys.executable, *arguments], capture_output=True)
+        times.append((perf_counter() - start) * 1000)
+    return times
+
+
+def run(args: Namespace) -> dict:
+    python_ms = min(_time_case(PYTHON, args.repeats))
+    print(f"{'python':<10} {python_ms:>8.1f}ms min")
+    results = []
+    for case, arguments in CASES.items():
+        times = _time_case(arguments, args.repeats)
+        modules = _loaded_modules(arguments)
+        # The fastest run is the least noisy estimate of the startup cost, it is what gets compared
+        results.append({"case": case, "stages": {"startup": {"wall_ms": min(times), "median_ms": median(times)}},
+                        "modules": modules})
+        print(f"{case:<10} {min(times):>8.1f}ms min {median(times):>8.1f}ms median  {', '.join(modules) or '-'}")
+    return {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "repeats": args.repeats,
+            "python_ms": python_ms,
+        },
+        "results": results,
+    }
+
+
+def main(args: Namespace):
+    report = run(args)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Rapor kaydedildi: {args.output}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold, STARTUP_NOISE_MS)
+        old_modules = {result["case"]: set(result.get("modules", [])) for result in baseline["results"]}
+        for result in report["results"]:
+            added = set(result["modules"]) - old_modules.get(result["case"], set(result["modules"]))
+            if added:
+                regressions.append(f"{result['case']:<22} yeni içe aktarılanlar: {', '.join(sorted(added))}")
+        if regressions:
+            print(f"{len(regressions)} yavaşlama bulundu:")
+            print("\n".join(regressions))
+            sys.exit(1)
+        print("Yavaşlama yok.")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Post hazırlayıcının açılış süresi ölçümü.")
+    parser.add_argument("--repeats", "-r", type=int, default=10,
+                        help="Her durumun kaç kez çalıştırılacağı")
+    parser.add_argument("--output", "-o", type=str,
+                        help="JSON raporun kaydedileceği dosya")
+    parser.add_argument("--compare", "-c", type=str,
+                        help="Karşılaştırılacak eski JSON rapor")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Yavaşlama sayılacak oran (0.10 = %%10)")
+    main(parser.parse_args())
@@ -0,0 +1 @@
+# Lets the tests import the modules at the repository root
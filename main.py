@@ -1,28 +1,35 @@
-from PIL import Image
+import json
 from argparse import ArgumentParser, Namespace
+from dataclasses import asdict
 from pathlib import Path
-from postermakerClass import PostMaker, EventInformation, PostInformation, Posts
+from postermakerClass import PostMaker, EventInformation, PostInformation, Posts, Backend, Gradient, ImageFormat, OutputOptions, TextFit, Tracer, RenderResult, peak_memory, font_index, font_info, FONTS_DIRECTORY
+
+# Font options and the text each one is used for
+FONT_OPTIONS = (("title_font", "title"), ("description_font", "description"), ("date_font", "date"),
+                ("place_font", "place"))
 
 
 def main(args: Namespace):
+    if args.watch:
+        # watchdog is only imported in watch mode
+        from watch import watch
+        watch(args)
+        return
+    if args.spec:
+        args = load_spec(args)
+    args = check_fonts(args)
     postmaker = PostMaker()
 
     background_image = None
 
     if args.background:
         background_image = Path(args.background)
-        try:
-            Image.open(background_image.absolute())
-        except:
-            raise ValueError("Arkaplan için girilen dosya bir resim değil!")
+        check_image(background_image, "Arkaplan için girilen dosya bir resim değil!")
 
     logo_image = None
     if args.logo:
         logo_image = Path(args.logo)
-        try:
-            Image.open(logo_image.absolute())
-        except:
-            raise ValueError("Logo için girilen dosya bir resim değil!")
+        check_image(logo_image, "Logo için girilen dosya bir resim değil!")
 
     event_information = EventInformation(
         title=(args.title, args.title_font, args.title_size),
@@ -30,21 +37,174 @@ def main(args: Namespace):
         date=(args.date, args.date_font, args.date_size),
         place=(args.place, args.place_font, args.place_size),
     )
+    output = get_output_options(args)
+    text_fit = TextFit(args.text_fit)
+    max_memory = get_max_memory(args)
 
-    if args.width and args.height:
+    if args.colors or args.texts:
+        results = postmaker.create_matrix(get_canvas_types(args), get_colors(args), get_event_variants(args, event_information),
+                                          args.qr, background_image, logo_image, args.savedir, Backend(args.backend),
+                                          args.workers, Gradient(args.gradient), output, text_fit, max_memory)
+        print_results(results)
+    elif args.width and args.height:
         postmaker.create(PostInformation(args.width, args.height, args.text_padding, args.xpadding, args.ypadding), args.bgcolor,
-                         args.fgcolor, event_information, args.qr, background_image, logo_image, args.savedir)
+                         args.fgcolor, event_information, args.qr, background_image, logo_image, args.savedir, Backend(args.backend), Gradient(args.gradient), output, text_fit,
+                         max_memory)
     elif args.canvas:
         postmaker.create(Posts[args.canvas], args.bgcolor,
-                         args.fgcolor, event_information, args.qr, background_image, logo_image, args.savedir)
+                         args.fgcolor, event_information, args.qr, background_image, logo_image, args.savedir, Backend(args.backend), Gradient(args.gradient), output, text_fit,
+                         max_memory)
     else:
-        for canvas_type in Posts:
-            postmaker.create(canvas_type, args.bgcolor,
-                             args.fgcolor, event_information, args.qr, background_image, logo_image, args.savedir)
+        if args.single_pdf:
+            if Backend(args.backend) != Backend.PDF:
+                raise ValueError("--single_pdf sadece 'pdf' altyapısı ile çalışır.")
+            results = postmaker.create_document(list(Posts), args.bgcolor, args.fgcolor, event_information, args.qr,
+                                                background_image, logo_image, args.savedir, Gradient(args.gradient),
+                                                output, args.workers or 1, text_fit, max_memory)
+        else:
+            results = postmaker.create_all(list(Posts), args.bgcolor, args.fgcolor, event_information, args.qr,
+                                           background_image, logo_image, args.savedir, Backend(args.backend), args.workers,
+                                           Gradient(args.gradient), output, text_fit, max_memory)
+        print_results(results)
     return
 
 
-if __name__ == "__main__":
+def get_canvas_types(args: Namespace) -> list[Posts | PostInformation]:
+    if args.width and args.height:
+        return [PostInformation(args.width, args.height, args.text_padding, args.xpadding, args.ypadding)]
+    if args.canvas:
+        # Spec files and batch rows can list several, separated by ";"
+        return [Posts[name.strip()] for name in args.canvas.split(";") if name.strip()]
+    return list(Posts)
+
+
+def apply_spec(args: Namespace, spec: dict) -> Namespace:
+    ''' A copy of args with the values in spec, whose keys are the long option names. Empty values are skipped.'''
+    types = {action.dest: action.type for action in build_parser()._actions}
+    args = Namespace(**vars(args))
+    for key, value in spec.items():
+        if key not in types or value is None or value == "":
+            continue
+        convert = types[key]
+        setattr(args, key, convert(value) if convert and isinstance(value, str) else value)
+    return args
+
+
+def load_spec(args: Namespace) -> Namespace:
+    with open(args.spec, encoding="utf-8") as f:
+        spec = json.load(f)
+    if not isinstance(spec, dict):
+        raise ValueError("Etkinlik dosyası, seçenek isimlerini değerlerine eşleyen bir JSON nesnesi olmalı.")
+    # Relative paths in the file are relative to the file, not to where the command runs
+    for key in ("background", "logo", "title_font", "description_font", "date_font", "place_font", "texts"):
+        if isinstance(spec.get(key), str) and spec[key] and not Path(spec[key]).is_absolute():
+            spec[key] = str(Path(args.spec).parent / spec[key])
+    return apply_spec(args, spec)
+
+
+def check_fonts(args: Namespace, fonts_directory: str | Path = FONTS_DIRECTORY) -> Namespace:
+    ''' Resolves the font options through the font index, a font is a file or the name of one in fonts_directory.
+    Fonts that can't be used are rejected here instead of in the middle of a render.'''
+    args = Namespace(**vars(args))
+    for option, text_option in FONT_OPTIONS:
+        font = getattr(args, option)
+        if Path(font).is_file():
+            info = font_info(font)
+        else:
+            info = font_index(fonts_directory).find(font)
+            if info is None:
+                raise ValueError(f"Font bulunamadı: {font}")
+        if not info.valid:
+            raise ValueError(f"{font} fontu kullanılamıyor: {info.error}")
+        missing = info.missing(getattr(args, text_option))
+        if missing:
+            print(f"Uyarı: {info.label} fontunda şu karakterler yok: {missing}")
+        setattr(args, option, info.path)
+    return args
+
+
+def check_image(image: Path, message: str):
+    ''' Reads only the header, the pixels are decoded later at the size the canvas needs.'''
+    from PIL import Image
+    try:
+        with Image.open(image.absolute()):
+            pass
+    except Exception:
+        raise ValueError(message)
+
+
+def print_results(results: list[RenderResult]):
+    for result in results:
+        memory = f", {result.peak_memory / 2**20:.0f} MB" if result.peak_memory else ""
+        if result.error:
+            print(f"{result.variant}: HATA ({result.error})")
+        else:
+            print(f"{result.variant}: {result.file_name} ({result.seconds:.2f} sn{memory})")
+
+
+def get_colors(args: Namespace) -> list[tuple[str, str]]:
+    ''' "#ffffff:#eb4034;#000000:#ffffff" -> [("#ffffff", "#eb4034"), ("#000000", "#ffffff")]'''
+    if not args.colors:
+        return [(args.bgcolor, args.fgcolor)]
+    colors = []
+    for pair in args.colors.split(";"):
+        if not pair.strip():
+            continue
+        bg_color, _, fg_color = pair.partition(":")
+        if not bg_color.strip() or not fg_color.strip():
+            raise ValueError(f"Renk çifti 'arkaplan:önplan' şeklinde olmalı: {pair}")
+        colors.append((bg_color.strip(), fg_color.strip()))
+    return colors
+
+
+def get_event_variants(args: Namespace, event_information: EventInformation) -> list[EventInformation]:
+    ''' Every object in the --texts file is a variant, the fields it leaves out are taken from the arguments.'''
+    if not args.texts:
+        return [event_information]
+    with open(args.texts, encoding="utf-8") as f:
+        texts = json.load(f)
+    return [EventInformation(
+        title=(text.get("title", args.title), args.title_font, args.title_size),
+        desc=(text.get("description", args.description), args.description_font, args.description_size),
+        date=(text.get("date", args.date), args.date_font, args.date_size),
+        place=(text.get("place", args.place), args.place_font, args.place_size),
+    ) for text in texts]
+
+
+def get_output_options(args: Namespace) -> OutputOptions:
+    return OutputOptions(
+        format=ImageFormat(args.format),
+        quality=args.quality,
+        compress_level=args.compress_level,
+        max_bytes=args.max_kb * 1024 if args.max_kb else None,
+        fast=args.preset == "fast",
+    )
+
+
+def get_max_memory(args: Namespace) -> int | None:
+    return args.max_memory_mb * 2**20 if args.max_memory_mb else None
+
+
+def print_profile(tracer: Tracer, trace_file: str | None = None):
+    summary = tracer.summary()
+    total = sum(stage["seconds"] for name, stage in summary.items() if name == "render") or \
+        sum(stage["seconds"] for stage in summary.values())
+    print(f"{'aşama':<12}{'adet':>6}{'süre':>12}{'oran':>8}")
+    for name, stage in summary.items():
+        print(f"{name:<12}{stage['count']:>6}{stage['seconds'] * 1000:>10.1f}ms{stage['seconds'] / total * 100:>7.1f}%")
+    # Renders in worker processes report their own peak
+    peaks = [peak_memory()] + [event.details.get("peak_memory") for event in tracer.events]
+    peaks = [peak for peak in peaks if peak]
+    if peaks:
+        print(f"En yüksek bellek kullanımı: {max(peaks) / 2**20:.0f} MB")
+    if trace_file:
+        with open(trace_file, "w", encoding="utf-8") as f:
+            json.dump({"summary": summary, "events": [asdict(event) for event in tracer.events]},
+                      f, indent=2, ensure_ascii=False)
+        print(f"Kayıt dosyası: {trace_file}")
+
+
+def build_parser() -> ArgumentParser:
     parser = ArgumentParser(description="Sosyal medya için post hazırlayıcı.")
     parser.add_argument(
         "--canvas", "-c",
@@ -186,5 +346,105 @@ if __name__ == "__main__":
         default=0,
         help="Görseldeki yazılar arasındaki mesafe (px). Pre-made Canvas'lar ile çalısmaz."
     )
-    args = parser.parse_args()
-    main(args)
+    parser.add_argument(
+        "--backend", "-b",
+        type=str,
+        default="pdf",
+        choices=[backend.value for backend in Backend],
+        help="Çizim altyapısı. 'pillow' PDF üretmeden doğrudan PNG kaydeder."
+    )
+    parser.add_argument(
+        "--workers", "-j",
+        type=int,
+        help="Tüm canvas'lar oluşturulurken kullanılacak işlemci sayısı. Varsayılan: çekirdek sayısı"
+    )
+    parser.add_argument(
+        "--gradient", "-g",
+        type=str,
+        default="raster",
+        choices=[gradient.value for gradient in Gradient],
+        help="Geçişlerin PDF'e nasıl yazılacağı. 'shading' resim yerine vektör kullanır, PDF'ler küçülür."
+    )
+    parser.add_argument(
+        "--format", "-fmt",
+        type=str,
+        default="png",
+        choices=[image_format.value for image_format in ImageFormat],
+        help="Kaydedilecek resmin formatı"
+    )
+    parser.add_argument(
+        "--quality", "-qu",
+        type=int,
+        help="JPEG ve WebP kalitesi (1-100). Varsayılan: 90"
+    )
+    parser.add_argument(
+        "--compress_level", "-cl",
+        type=int,
+        help="PNG sıkıştırma seviyesi (0-9) ya da WebP yöntemi (0-6). Yüksek değerler daha küçük ama daha yavaş."
+    )
+    parser.add_argument(
+        "--max_kb", "-mk",
+        type=int,
+        help="Dosya boyutu sınırı (kB). JPEG ve WebP'de sınıra sığan en yüksek kalite aranır."
+    )
+    parser.add_argument(
+        "--preset", "-pr",
+        type=str,
+        default="default",
+        choices=["default", "fast"],
+        help="'fast' dosya boyutu pahasına en hızlı kodlama ayarlarını kullanır."
+    )
+    parser.add_argument(
+        "--text_fit", "-fit",
+        type=str,
+        default="fixed",
+        choices=[text_fit.value for text_fit in TextFit],
+        help="'auto' yazıları genişliğe göre satırlara böler ve sığana kadar küçültür. Verilen font boyutları üst sınır olur."
+    )
+    parser.add_argument(
+        "--single_pdf", "-spdf",
+        action="store_true",
+        help="Tüm canvas'ları tek bir çok sayfalı PDF'e çizer ve tek seferde resme çevirir. --workers poppler'ın iş parçacığı sayısı olur."
+    )
+    parser.add_argument(
+        "--max_memory_mb", "-mm",
+        type=int,
+        help="Arka plan resminin bellekte kaplayabileceği en fazla alan (MB). Aşılırsa resim açılmaz, hata verilir."
+    )
+    parser.add_argument(
+        "--colors", "-cs",
+        type=str,
+        help="';' ile ayrılmış 'arkaplan:önplan' renk çiftleri. Verilirse her canvas her renk çiftiyle çizilir."
+    )
+    parser.add_argument(
+        "--texts", "-tx",
+        type=str,
+        help="Yazı varyantlarını içeren .json dosyası: title, description, date ve place alanları olan nesnelerin listesi. Eksik alanlar diğer seçeneklerden alınır."
+    )
+    parser.add_argument(
+        "--spec", "-sp",
+        type=str,
+        help="Seçenekleri içeren .json dosyası. Anahtarlar seçeneklerin uzun isimleridir, komut satırındaki değerlerin yerine geçer."
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Önce bir kez oluşturur, sonra etkinlik dosyası, resimler ya da fontlar değiştikçe sadece etkilenen postları yeniden oluşturur."
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="",
+        help="Aşama aşama süreleri yazdırır. Bir dosya verilirse tüm olaylar JSON olarak oraya da kaydedilir."
+    )
+    return parser
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    if args.profile is not None:
+        with Tracer() as tracer:
+            main(args)
+        print_profile(tracer, args.profile)
+    else:
+        main(args)
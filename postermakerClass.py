@@ -1,19 +1,47 @@
+# Pillow, reportlab, numpy, qrcode and pdf2image are imported where they are used, so importing this module
+# (and `main.py --help`) stays fast and a render only loads what its backend needs
+from __future__ import annotations
 from enum import Enum
-from PIL import ImageDraw, ImageOps, Image, ImageColor
 from pathlib import Path
-from dataclasses import dataclass
+from dataclasses import dataclass, field, replace
 import re
-import qrcode
-from qrcode.constants import ERROR_CORRECT_M
+import hashlib
+from math import ceil
+from typing import TYPE_CHECKING, Callable, BinaryIO
 from io import BytesIO
-from reportlab.pdfgen import canvas as c
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.pdfmetrics import stringWidth
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.lib.colors import HexColor
-from reportlab.lib.utils import ImageReader
-from typing import Callable
-from pdf2image import convert_from_path
+from threading import Lock
+from collections import OrderedDict
+from bisect import bisect_right
+import json
+import os
+from time import perf_counter
+from functools import lru_cache
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar, copy_context
+import sys
+if TYPE_CHECKING:
+    import asyncio
+    from concurrent.futures import Executor
+    import numpy as np
+    from PIL import Image, ImageFont
+    from reportlab.pdfgen import canvas as c
+    from reportlab.lib.colors import HexColor
+    from reportlab.lib.utils import ImageReader
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, peak memory isn't reported there
+    resource = None
+
+
+def convert_from_path(*args, **kwargs):
+    from pdf2image import convert_from_path
+    return convert_from_path(*args, **kwargs)
+
+
+def convert_from_bytes(*args, **kwargs):
+    from pdf2image import convert_from_bytes
+    return convert_from_bytes(*args, **kwargs)
 
 
 @dataclass
@@ -50,6 +78,721 @@ class Posts(Enum):
                              text_padding=55, x_padding=0, y_padding=0)
 
 
+@dataclass(frozen=True)
+class FontMetrics():
+    ''' Metrics of a parsed font file, in 1/1000 em units like reportlab's.'''
+    name: str
+    path: Path
+    mtime: int
+    ascent: float
+    descent: float
+    widths: dict[int, float]
+    default_width: float
+
+    def get_ascent(self, font_size: float) -> float:
+        return self.ascent * font_size / 1000
+
+    def get_descent(self, font_size: float) -> float:
+        return self.descent * font_size / 1000
+
+    def string_width(self, text: str, font_size: float) -> float:
+        widths = self.widths
+        default_width = self.default_width
+        return sum(widths.get(ord(char), default_width) for char in text) * font_size / 1000
+
+
+class FontRegistry():
+    ''' Process-wide cache of parsed fonts keyed by path and mtime. Each font file is parsed
+    and registered with reportlab only once.'''
+
+    def __init__(self):
+        self._fonts: dict[tuple[str, int], FontMetrics] = {}
+        self._names: dict[str, str] = {}
+        self._pillow_fonts: dict[tuple[str, float], ImageFont.FreeTypeFont] = {}
+        self._lock = Lock()
+
+    def get(self, font_path: str | Path) -> FontMetrics:
+        font_path = Path(font_path).resolve()
+        key = (str(font_path), font_path.stat().st_mtime_ns)
+        metrics = self._fonts.get(key)
+        if metrics is not None:
+            return metrics
+        with self._lock:
+            metrics = self._fonts.get(key)
+            if metrics is None:
+                metrics = self._parse(font_path)
+                self._fonts[key] = metrics
+        return metrics
+
+    def _parse(self, font_path: Path) -> FontMetrics:
+        from reportlab.pdfbase import pdfmetrics
+        from reportlab.pdfbase.ttfonts import TTFont
+        font_name = font_path.stem.replace(' ', '_')
+        # Different files with the same stem must not overwrite each other in reportlab
+        if self._names.get(font_name, str(font_path)) != str(font_path):
+            font_name = f"{font_name}_{len(self._names)}"
+        self._names[font_name] = str(font_path)
+        # The file changed since it was last parsed, its Pillow fonts are stale too
+        for key in [key for key in self._pillow_fonts if key[0] == font_name]:
+            del self._pillow_fonts[key]
+
+        font = TTFont(font_name, font_path)
+        pdfmetrics.registerFont(font)
+        face = font.face
+        return FontMetrics(
+            name=font_name,
+            path=font_path,
+            mtime=font_path.stat().st_mtime_ns,
+            ascent=face.ascent,
+            descent=face.descent,
+            widths=dict(face.charWidths),
+            default_width=face.defaultWidth,
+        )
+
+    def get_pillow_font(self, font_name: str, font_size: float) -> ImageFont.FreeTypeFont:
+        from PIL import ImageFont
+        key = (font_name, font_size)
+        font = self._pillow_fonts.get(key)
+        if font is None:
+            font = ImageFont.truetype(self._names[font_name], font_size)
+            self._pillow_fonts[key] = font
+        return font
+
+
+font_registry = FontRegistry()
+
+FONTS_DIRECTORY = "Fonts"
+FONT_SUFFIXES = (".ttf", ".otf", ".ttc")
+# Kept in the fonts directory, bump the version when FontInfo changes
+FONT_INDEX_FILE = ".font_index.json"
+FONT_INDEX_VERSION = 1
+
+
+@dataclass(frozen=True)
+class FontInfo():
+    ''' What the font index knows about a font file. error is set when reportlab can't use the file.'''
+    path: str
+    mtime: int
+    size: int
+    family: str = ""
+    style: str = ""
+    # Covered code points as sorted (first, last) ranges
+    coverage: tuple[tuple[int, int], ...] = ()
+    error: str | None = None
+
+    @property
+    def valid(self) -> bool:
+        return self.error is None
+
+    @property
+    def label(self) -> str:
+        return f"{self.family} {self.style}".strip() or Path(self.path).stem
+
+    def missing(self, text: str) -> str:
+        ''' The distinct characters of text the font has no glyph for, whitespace aside.'''
+        starts = [first for first, _ in self.coverage]
+        missing = []
+        for char in dict.fromkeys(text.replace(r'\n', '\n')):
+            index = bisect_right(starts, ord(char)) - 1
+            if not char.isspace() and (index < 0 or ord(char) > self.coverage[index][1]):
+                missing.append(char)
+        return "".join(missing)
+
+
+def _read_font_info(font_path: Path, stat: os.stat_result) -> FontInfo:
+    from reportlab.pdfbase.ttfonts import TTFontFile
+    try:
+        font = TTFontFile(str(font_path))
+    except Exception as e:
+        return FontInfo(str(font_path), stat.st_mtime_ns, stat.st_size, error=str(e) or type(e).__name__)
+
+    def decode(name) -> str:
+        return name.decode("utf-8", "replace") if isinstance(name, bytes) else str(name or "")
+
+    coverage = []
+    for code in sorted(font.charToGlyph):
+        if coverage and coverage[-1][1] == code - 1:
+            coverage[-1][1] = code
+        else:
+            coverage.append([code, code])
+    return FontInfo(str(font_path), stat.st_mtime_ns, stat.st_size, decode(font.familyName),
+                    decode(font.styleName), tuple(map(tuple, coverage)))
+
+
+class FontIndex():
+    ''' The font files of a directory with their family, style, glyph coverage and whether they can be used.
+    Only new or changed files (by mtime and size) are parsed again. With persist the entries are saved to
+    FONT_INDEX_FILE in the directory, so a large font library is read once and not on every start.'''
+
+    def __init__(self, directory: str | Path, persist: bool = True):
+        self.directory = Path(directory)
+        self.persist = persist
+        self._fonts: dict[str, FontInfo] | None = None
+        self._lock = Lock()
+
+    def scan(self) -> list[FontInfo]:
+        ''' Every font file in the directory, sorted by file name. Files with other suffixes are skipped.'''
+        with self._lock:
+            fonts = self._load()
+            found: dict[str, FontInfo] = {}
+            changed = False
+            files = sorted(self.directory.iterdir()) if self.directory.is_dir() else []
+            for font_path in files:
+                if font_path.suffix.lower() not in FONT_SUFFIXES or not font_path.is_file():
+                    continue
+                info, parsed = self._entry(font_path.resolve(), fonts.get(font_path.name))
+                found[font_path.name] = info
+                changed |= parsed
+            if changed or found.keys() != fonts.keys():
+                self._fonts = found
+                self._save()
+            return list(found.values())
+
+    def get(self, font_path: str | Path) -> FontInfo:
+        ''' The entry of one file of the directory, parsed only if it is new or changed.'''
+        font_path = Path(font_path).resolve()
+        with self._lock:
+            fonts = self._load()
+            info, parsed = self._entry(font_path, fonts.get(font_path.name))
+            if parsed:
+                fonts[font_path.name] = info
+                self._save()
+            return info
+
+    def find(self, name: str) -> FontInfo | None:
+        ''' A font by file name, file name without suffix or "family style", ignoring case.'''
+        name = name.casefold()
+        for info in self.scan():
+            if name in (Path(info.path).name.casefold(), Path(info.path).stem.casefold(), info.label.casefold()):
+                return info
+        return None
+
+    def _entry(self, font_path: Path, info: FontInfo | None) -> tuple[FontInfo, bool]:
+        stat = font_path.stat()
+        if info is not None and (info.mtime, info.size) == (stat.st_mtime_ns, stat.st_size):
+            return info, False
+        return _read_font_info(font_path, stat), True
+
+    def _load(self) -> dict[str, FontInfo]:
+        if self._fonts is None:
+            self._fonts = {}
+            if not self.persist:
+                return self._fonts
+            try:
+                with open(self.directory / FONT_INDEX_FILE, encoding="utf-8") as f:
+                    saved = json.load(f)
+                if saved.get("version") == FONT_INDEX_VERSION:
+                    self._fonts = {name: FontInfo(str((self.directory / name).resolve()), entry["mtime"], entry["size"],
+                                                  entry["family"], entry["style"],
+                                                  tuple(map(tuple, entry["coverage"])), entry["error"])
+                                   for name, entry in saved["fonts"].items()}
+            except (OSError, ValueError, KeyError, TypeError, AttributeError):
+                # Missing, old or damaged, every font is parsed again
+                pass
+        return self._fonts
+
+    def _save(self) -> None:
+        if not self.persist:
+            return
+        saved = {"version": FONT_INDEX_VERSION,
+                 "fonts": {name: {"mtime": info.mtime, "size": info.size, "family": info.family,
+                                  "style": info.style, "coverage": info.coverage, "error": info.error}
+                           for name, info in self._fonts.items()}}
+        index_file = self.directory / FONT_INDEX_FILE
+        temporary = index_file.with_name(f"{FONT_INDEX_FILE}.{os.getpid()}")
+        try:
+            temporary.write_text(json.dumps(saved, ensure_ascii=False), encoding="utf-8")
+            # Another process reading the index sees the old or the new one, never half of it
+            os.replace(temporary, index_file)
+        except OSError:
+            # A read-only directory works too, it is just scanned again next time
+            temporary.unlink(missing_ok=True)
+
+
+@lru_cache(maxsize=None)
+def _font_index(directory: str) -> FontIndex:
+    # Only the project's own fonts folder gets an index file, other folders may belong to the user or the system
+    return FontIndex(directory, persist=directory == str(Path(FONTS_DIRECTORY).resolve()))
+
+
+def font_index(directory: str | Path = FONTS_DIRECTORY) -> FontIndex:
+    ''' The process-wide index of directory. Only the index of FONTS_DIRECTORY is saved to disk.'''
+    return _font_index(str(Path(directory).resolve()))
+
+
+@lru_cache(maxsize=256)
+def _cached_font_info(font_path: str, mtime: int, size: int) -> FontInfo:
+    return _read_font_info(Path(font_path), os.stat(font_path))
+
+
+def font_info(font_path: str | Path) -> FontInfo:
+    ''' The entry of any font file. Files in FONTS_DIRECTORY come from its index, others are parsed and kept in
+    memory only, nothing is written next to them.'''
+    font_path = Path(font_path).resolve()
+    if font_path.parent == Path(FONTS_DIRECTORY).resolve():
+        return font_index().get(font_path)
+    stat = font_path.stat()
+    return _cached_font_info(str(font_path), stat.st_mtime_ns, stat.st_size)
+
+
+# chosen with https://cubic-bezier.com/
+GRADIENT_EASE = (0, .7, .9, 1)
+# Linear pieces used to approximate the easing curve in PDF shadings
+SHADING_SEGMENTS = 32
+# JPEG backgrounds up to this many times larger (per side) than the area they cover are embedded without re-encoding
+JPEG_PASSTHROUGH_SCALE = 2
+# Share of the canvas height the title block (title, description) and the bottom block (date, place)
+# may take up when text is fitted automatically, and the share of the width kept free for the logo
+AUTO_FIT_TOP_SHARE = 0.3
+AUTO_FIT_BOTTOM_SHARE = 0.25
+AUTO_FIT_LOGO_SHARE = 0.3
+MIN_FONT_SIZE = 8
+# Quality used by the lossy formats when none is given, and the lowest one tried to meet a size budget
+DEFAULT_QUALITY = 90
+MIN_QUALITY = 20
+
+
+def _create_cubic_bezier(p1: float, p2: float, p3: float, p4: float) -> Callable[[np.ndarray], np.ndarray]:
+    return lambda t: p1*(1-t)**3 + t*3*p2*(1-t)**2 + (t**2)*p3*(1-t)*3 + p4*t**3
+
+
+@lru_cache(maxsize=64)
+def _gradient_alpha(height: int, curve: tuple[float, float, float, float], flip: bool) -> np.ndarray:
+    ''' Alpha value of every row of a gradient, opaque at the top unless flipped.'''
+    import numpy as np
+    ease = _create_cubic_bezier(*curve)
+    alpha = (255 * ease(1 - np.arange(height) / height)).astype(np.uint8)
+    if flip:
+        alpha = alpha[::-1].copy()
+    alpha.flags.writeable = False
+    return alpha
+
+
+@lru_cache(maxsize=16)
+def _gradient_mask(size: tuple[int, int], curve: tuple[float, float, float, float], flip: bool) -> Image.Image:
+    from PIL import Image
+    width, height = size
+    column = Image.fromarray(_gradient_alpha(height, curve, flip)[:, None], "L")
+    return column.resize(size, Image.NEAREST)
+
+
+@lru_cache(maxsize=8)
+def _gradient_reader(color: tuple[int, int, int], size: tuple[int, int],
+                     curve: tuple[float, float, float, float], flip: bool) -> ImageReader:
+    from reportlab.lib.utils import ImageReader
+    # reportlab keeps the raw pixels and their digest in the reader, so repeated draws reuse both
+    return ImageReader(_gradient_image(color, size, curve, flip))
+
+
+@lru_cache(maxsize=8)
+def _gradient_image(color: tuple[int, int, int], size: tuple[int, int],
+                    curve: tuple[float, float, float, float], flip: bool) -> Image.Image:
+    from PIL import Image
+    gradient_image = Image.new("RGBA", size, color)
+    gradient_image.putalpha(_gradient_mask(size, curve, flip))
+    return gradient_image
+
+
+@dataclass(frozen=True)
+class TextBox():
+    x: float
+    y: float
+    width: float
+    height: float
+    ascent: float
+    descent: float
+
+
+@dataclass(frozen=True)
+class PosterLayout():
+    ''' Where everything goes on a canvas. Computed without drawing, so it can be cached and shared.'''
+    title: TextBox
+    description: TextBox
+    date: TextBox
+    place: TextBox
+    # Size of the logo block (QR code included) drawn at the bottom right corner
+    logo_slot: tuple[int, int] | None
+
+
+PREVIEW_SCALE = 0.25
+PREVIEW_ASSETS_CACHE_SIZE = 16
+_preview_assets: OrderedDict[tuple, "PosterAssets"] = OrderedDict()
+_preview_assets_lock = Lock()
+
+LAYER_CACHE_BYTES = 256 * 1024 * 1024
+LAYER_SPILL_BYTES = 1024 * 1024 * 1024
+
+LAYOUT_CACHE_SIZE = 256
+_layouts: OrderedDict[tuple, PosterLayout] = OrderedDict()
+_layouts_lock = Lock()
+_fits: OrderedDict[tuple, "EventInformation"] = OrderedDict()
+_fits_lock = Lock()
+
+
+def peak_memory() -> int | None:
+    ''' Highest resident memory of this process so far in bytes, None where it can't be read.'''
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _image_bytes(image: Image.Image) -> int:
+    return image.width * image.height * len(image.getbands())
+
+
+def _image_digest(image: Image.Image) -> str:
+    digest = hashlib.sha256(f"{image.mode}{image.size}".encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+class LayerCache():
+    ''' Rendered layers (fitted background, background with bands and gradients, resized logo) keyed by a hash
+    of their inputs. The least recently used layers are dropped once they add up to max_bytes, or moved to
+    spill_dir when one is set and read back from there on a later hit. Layers are shared, never draw on them.'''
+
+    def __init__(self, max_bytes: int = LAYER_CACHE_BYTES, spill_dir: str | Path | None = None,
+                 max_spill_bytes: int = LAYER_SPILL_BYTES):
+        self._layers: OrderedDict[str, Image.Image] = OrderedDict()
+        self._bytes = 0
+        self._lock = Lock()
+        self.configure(max_bytes, spill_dir, max_spill_bytes)
+
+    def configure(self, max_bytes: int = LAYER_CACHE_BYTES, spill_dir: str | Path | None = None,
+                  max_spill_bytes: int = LAYER_SPILL_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.max_spill_bytes = max_spill_bytes
+        self.spill_dir = Path(spill_dir) if spill_dir else None
+        if self.spill_dir:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+        # A lower limit evicts like a put does, the layers that no longer fit are spilled
+        self._evict()
+
+    @staticmethod
+    def key(*parts) -> str:
+        return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+    def get(self, key: str) -> Image.Image | None:
+        from PIL import Image
+        with self._lock:
+            layer = self._layers.get(key)
+            if layer is not None:
+                self._layers.move_to_end(key)
+                return layer
+        if self.spill_dir is None:
+            return None
+        try:
+            with Image.open(self.spill_dir / f"{key}.tiff") as image:
+                layer = image.copy()
+        except OSError:
+            return None
+        self.put(key, layer)
+        return layer
+
+    def put(self, key: str, layer: Image.Image) -> None:
+        with self._lock:
+            if key in self._layers:
+                return
+            self._layers[key] = layer
+            self._bytes += _image_bytes(layer)
+        self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._layers.clear()
+            self._bytes = 0
+
+    def _evict(self) -> None:
+        evicted = []
+        with self._lock:
+            while self._bytes > self.max_bytes and self._layers:
+                key, layer = self._layers.popitem(last=False)
+                self._bytes -= _image_bytes(layer)
+                evicted.append((key, layer))
+        # Written outside the lock, a slow disk doesn't block the other renders
+        if self.spill_dir:
+            for key, layer in evicted:
+                self._spill(key, layer)
+
+    def _spill(self, key: str, layer: Image.Image) -> None:
+        path = self.spill_dir / f"{key}.tiff"
+        if path.exists():
+            return
+        # Uncompressed, reading it back is about as fast as a copy. Written aside first so another process
+        # never reads half a file.
+        temporary = path.with_suffix(f".{id(layer)}.tmp")
+        layer.save(temporary, "TIFF")
+        temporary.replace(path)
+
+        files = sorted(self.spill_dir.glob("*.tiff"), key=lambda file: file.stat().st_mtime)
+        total = sum(file.stat().st_size for file in files)
+        for file in files:
+            if total <= self.max_spill_bytes:
+                break
+            total -= file.stat().st_size
+            file.unlink(missing_ok=True)
+
+
+layer_cache = LayerCache()
+
+
+# Rows of QR modules including the quiet zone, True is a dark module
+QRMatrix = tuple[tuple[bool, ...], ...]
+
+
+@lru_cache(maxsize=32)
+def _qr_matrix(qr_data: str, error: int, border: int) -> QRMatrix:
+    import qrcode
+    qr = qrcode.QRCode(
+        version=None,
+        error_correction=error,
+        border=border,
+    )
+    qr.add_data(qr_data)
+    qr.make(fit=True)
+    return tuple(tuple(row) for row in qr.get_matrix())
+
+
+@lru_cache(maxsize=32)
+def _qr_runs(matrix: QRMatrix) -> tuple[tuple[int, int, int], ...]:
+    ''' Horizontal runs of dark modules as (row, first column, length).'''
+    runs = []
+    for row_index, row in enumerate(matrix):
+        column = 0
+        while column < len(row):
+            if not row[column]:
+                column += 1
+                continue
+            start = column
+            while column < len(row) and row[column]:
+                column += 1
+            runs.append((row_index, start, column - start))
+    return tuple(runs)
+
+
+@dataclass
+class PosterAssets():
+    ''' Images shared by every canvas variant of a poster. The background is only decoded when a
+    backend needs its pixels, JPEGs can go into the PDF as they are.'''
+    background_path: Path | None = None
+    # Compressed contents of a background given as a file-like object
+    background_data: bytes | None = None
+    background_format: str | None = None
+    background_size: tuple[int, int] | None = None
+    background: Image.Image | None = None
+    logo: Image.Image | None = None
+    qr: QRMatrix | None = None
+    # Content hashes used in layer cache keys, computed on first use
+    background_key: str | None = None
+    logo_key: str | None = None
+
+    @property
+    def has_background(self) -> bool:
+        return bool(self.background_path or self.background_data or self.background)
+
+
+class ImageFormat(Enum):
+    PNG = "png"
+    JPEG = "jpeg"
+    WEBP = "webp"
+
+    @property
+    def extension(self) -> str:
+        return "jpg" if self == ImageFormat.JPEG else self.value
+
+    @property
+    def mimetype(self) -> str:
+        return f"image/{self.value}"
+
+
+@dataclass
+class RenderedPoster():
+    file_name: str
+    image: bytes
+    pdf: bytes | None = None
+    format: ImageFormat = ImageFormat.PNG
+
+
+@dataclass
+class TraceEvent():
+    stage: str
+    seconds: float
+    details: dict = field(default_factory=dict)
+
+
+@dataclass
+class RenderResult():
+    variant: str
+    file_name: str | None
+    seconds: float
+    error: str | None = None
+    events: list[TraceEvent] = field(default_factory=list)
+    # Peak memory of the process that rendered it, in bytes
+    peak_memory: int | None = None
+
+
+class Backend(Enum):
+    PDF = "pdf"
+    PILLOW = "pillow"
+
+
+class Gradient(Enum):
+    # Embedded RGBA images
+    RASTER = "raster"
+    # Vector shading with a soft mask, PDF backend only
+    SHADING = "shading"
+
+
+@dataclass(frozen=True)
+class OutputOptions():
+    ''' How the raster image is encoded. quality is used by JPEG and WebP, compress_level is the zlib level
+    of PNG and the method of WebP. When max_bytes is given the highest quality that fits is searched for.
+    fast picks the quickest encoder settings for whatever isn't set explicitly.'''
+    format: ImageFormat = ImageFormat.PNG
+    quality: int | None = None
+    compress_level: int | None = None
+    max_bytes: int | None = None
+    fast: bool = False
+
+
+class TextFit(Enum):
+    # Sizes and line breaks exactly as given
+    FIXED = "fixed"
+    # Wrapped to the canvas and shrunk until every block fits, the given sizes are the largest allowed
+    AUTO = "auto"
+
+
+@dataclass(frozen=True)
+class RenderOptions():
+    backend: Backend = Backend.PDF
+    gradient: Gradient = Gradient.RASTER
+    output: OutputOptions = OutputOptions()
+    text_fit: TextFit = TextFit.FIXED
+    # Most memory the decoded background may take, in bytes. It is decoded at reduced size anyway, this
+    # fails the render instead of letting a huge photo take the machine down.
+    max_memory: int | None = None
+
+
+class Tracer():
+    ''' Collects a TraceEvent for every stage of the renders run inside `with tracer:`, and passes each one to
+    callback as it happens. The active tracer is a context variable, renders in other threads aren't mixed in.'''
+
+    def __init__(self, callback: Callable[[TraceEvent], None] | None = None):
+        self.events: list[TraceEvent] = []
+        self._callback = callback
+        self._tokens = []
+
+    def __enter__(self) -> "Tracer":
+        self._tokens.append(_tracer.set(self))
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        _tracer.reset(self._tokens.pop())
+
+    def emit(self, event: TraceEvent) -> None:
+        self.events.append(event)
+        if self._callback:
+            self._callback(event)
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        ''' Call count and total seconds of every stage, in the order they first ran.'''
+        stages: dict[str, dict[str, float]] = {}
+        for event in self.events:
+            stage = stages.setdefault(event.stage, {"count": 0, "seconds": 0.0})
+            stage["count"] += 1
+            stage["seconds"] += event.seconds
+        return stages
+
+
+_tracer: ContextVar[Tracer | None] = ContextVar("postermaker_tracer", default=None)
+
+
+@contextmanager
+def _stage(name: str, **details):
+    ''' Times the block for the active tracer. The block can add to the yielded details.'''
+    tracer = _tracer.get()
+    if tracer is None:
+        yield details
+        return
+    start = perf_counter()
+    try:
+        yield details
+    finally:
+        tracer.emit(TraceEvent(name, perf_counter() - start, details))
+
+
+def _gradient_cache_misses() -> int:
+    return sum(cached.cache_info().misses for cached in
+               (_gradient_alpha, _gradient_mask, _gradient_reader, _gradient_image))
+
+
+class PillowCanvas():
+    ''' Draws into a Pillow image using the subset of the reportlab canvas API that PostMaker needs.
+    Coordinates are in reportlab's space (origin at the bottom left) so both backends share the same layout code.'''
+
+    def __init__(self, pagesize: tuple[int, int]):
+        from PIL import Image, ImageDraw
+        self._pagesize = pagesize
+        self.image = Image.new("RGB", pagesize, "white")
+        self._draw = ImageDraw.Draw(self.image)
+        self._fill_color = (0, 0, 0)
+        self._font: ImageFont.FreeTypeFont | None = None
+        self._states: list[tuple] = []
+
+    def _to_top(self, y: float, height: float) -> int:
+        return int(round(self._pagesize[1] - y - height))
+
+    def saveState(self) -> None:
+        self._states.append((self._fill_color, self._font))
+
+    def restoreState(self) -> None:
+        self._fill_color, self._font = self._states.pop()
+
+    def setFillColor(self, color: HexColor) -> None:
+        self._fill_color = color.bitmap_rgb()
+
+    def setStrokeColor(self, color: HexColor) -> None:
+        # Strokes are only used to outline filled rectangles, which fill already covers
+        pass
+
+    def setFont(self, font_name: str, font_size: float) -> None:
+        self._font = font_registry.get_pillow_font(font_name, font_size)
+
+    def rect(self, x: float, y: float, width: float, height: float, stroke: int = 1, fill: int = 0) -> None:
+        if not fill or width <= 0 or height <= 0:
+            return
+        top = self._to_top(y, height)
+        self._draw.rectangle(
+            [int(x), top, int(x + width) - 1, top + int(height) - 1], fill=self._fill_color)
+
+    def drawString(self, x: float, y: float, text: str) -> None:
+        self._draw.text((x, self._pagesize[1] - y), text,
+                        font=self._font, fill=self._fill_color, anchor="ls")
+
+    def drawInlineImage(self, image: Image.Image, x: float, y: float,
+                        width: float | None = None, height: float | None = None) -> None:
+        self.drawImage(image.convert("RGB"), x, y, width, height)
+
+    def drawImage(self, image: Image.Image, x: float, y: float,
+                  width: float | None = None, height: float | None = None, mask: str | None = None) -> None:
+        from PIL import Image
+        # LA and transparent palette images keep their alpha, it is the paste mask
+        has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha else "RGB")
+        size = (int(width or image.width), int(height or image.height))
+        if image.size != size:
+            image = image.resize(size, Image.LANCZOS)
+        position = (int(x), self._to_top(y, size[1]))
+        self.image.paste(image, position, image if has_alpha else None)
+
+    def drawGradient(self, color: tuple[int, int, int], mask: Image.Image, x: float, y: float) -> None:
+        ''' Blends a single color through an alpha mask, without building an RGBA image.'''
+        left, top = int(x), self._to_top(y, mask.height)
+        self.image.paste(color, (left, top, left + mask.width, top + mask.height), mask)
+
+
 class PostMaker():
 
     def _get_padding(self, canvas_type: Posts | PostInformation) -> tuple[int, int, int]:
@@ -57,96 +800,190 @@ class PostMaker():
             canvas_type = canvas_type.value
         return (canvas_type.x_padding, canvas_type.y_padding, canvas_type.text_padding)
 
-    def _place_bg_image(self, canvas: c.Canvas, bg_image: Path, padding: tuple[int, int] | tuple[int, int, int]):
+    def _place_bg_image(self, canvas: c.Canvas | PillowCanvas, assets: PosterAssets, padding: tuple[int, int] | tuple[int, int, int],
+                        max_memory: int | None = None):
         c_width, c_height = canvas._pagesize
         desired_size = (c_width, c_height - (2 * padding[1]))
-        image = Image.open(bg_image)
-        image = image.copy()
-        image = ImageOps.fit(image, desired_size)
-        canvas.drawInlineImage(image, 0, padding[1])
+        with _stage("background", size=desired_size) as details:
+            if not isinstance(canvas, PillowCanvas) and self._can_pass_through(assets, desired_size):
+                details["passthrough"] = True
+                self._place_jpeg(canvas, assets, desired_size, padding[1])
+                return
+            _, image = self._fit_background(assets, desired_size, details, max_memory)
+            self._draw_image(canvas, image, 0, padding[1])
+
+    def _fit_background(self, assets: PosterAssets, desired_size: tuple[int, int],
+                        details: dict | None = None, max_memory: int | None = None) -> tuple[str, Image.Image]:
+        ''' The background cropped to desired_size and its layer cache key.'''
+        from PIL import ImageOps
+        details = {} if details is None else details
+        key = LayerCache.key("background", self._background_key(assets), desired_size)
+        image = layer_cache.get(key)
+        details["cache"] = "miss" if image is None else "hit"
+        if image is None:
+            decoded = assets.background
+            image = ImageOps.fit(self._get_background(assets, [desired_size], max_memory), desired_size)
+            details["decoded"] = assets.background is not decoded
+            layer_cache.put(key, image)
+        return key, image
+
+    def _background_key(self, assets: PosterAssets) -> str | None:
+        if assets.background_key is None and assets.background_path:
+            path = assets.background_path.resolve()
+            assets.background_key = LayerCache.key(str(path), path.stat().st_mtime_ns)
+        elif assets.background_key is None and assets.background_data:
+            assets.background_key = hashlib.sha256(assets.background_data).hexdigest()
+        elif assets.background_key is None and assets.background:
+            assets.background_key = _image_digest(assets.background)
+        return assets.background_key
+
+    def _get_background(self, assets: PosterAssets, sizes: list[tuple[int, int]] | None = None,
+                        max_memory: int | None = None) -> Image.Image:
+        ''' The background decoded just large enough to cover every size in sizes, all of it without sizes.
+        Decoded again when a later size needs more pixels than the kept one has.'''
+        if assets.background_path is None and assets.background_data is None:
+            return assets.background
+        width, height = assets.background_size
+        scale = min(1, max(max(w / width, h / height) for w, h in sizes)) if sizes else 1
+        if assets.background is None or assets.background.width < ceil(width * scale):
+            source = assets.background_path or BytesIO(assets.background_data)
+            assets.background = self._open_reduced(source, (ceil(width * scale), ceil(height * scale)),
+                                                   max_memory=max_memory)
+        return assets.background
+
+    def _prepare_background(self, assets: PosterAssets, infos: list[PostInformation], options: RenderOptions) -> None:
+        ''' Decodes the background once for all variants, as large as the largest one that needs its pixels.'''
+        sizes = [(info.width, info.height - 2 * info.y_padding) for info in infos]
+        sizes = [size for size in sizes
+                 if options.backend == Backend.PILLOW or not self._can_pass_through(assets, size)]
+        if assets.has_background and sizes:
+            self._get_background(assets, sizes, options.max_memory)
+
+    def _can_pass_through(self, assets: PosterAssets, desired_size: tuple[int, int]) -> bool:
+        if assets.background_format != "JPEG" or assets.background_path is None:
+            return False
+        width, height = assets.background_size
+        scale = max(desired_size[0] / width, desired_size[1] / height)
+        return scale * JPEG_PASSTHROUGH_SCALE >= 1
+
+    def _place_jpeg(self, canvas: c.Canvas, assets: PosterAssets, desired_size: tuple[int, int], y: int):
+        ''' Same crop as ImageOps.fit, done with a clipping path so the JPEG data is embedded as DCT.'''
+        width, height = assets.background_size
+        dw, dh = desired_size
+        scale = max(dw / width, dh / height)
+        image_width, image_height = width * scale, height * scale
+
+        canvas.saveState()
+        clip = canvas.beginPath()
+        clip.rect(0, y, dw, dh)
+        canvas.clipPath(clip, stroke=0, fill=0)
+        # A filename makes reportlab copy the JPEG stream and reuse it by name
+        canvas.drawImage(str(assets.background_path), (dw - image_width) / 2, y + (dh - image_height) / 2,
+                         width=image_width, height=image_height)
+        canvas.restoreState()
 
-    # This function was generated by AI
     def _generate_qr(self, qr_data: str,
-                     size: tuple[int, int] = (300, 300),
                      *,
-                     fill: str = "black",
-                     back: str = "white",
-                     error=ERROR_CORRECT_M,
-                     border: int = 4,
-                     box_size: int = 10) -> Image.Image:
-
-        qr = qrcode.QRCode(
-            version=None,
-            error_correction=error,
-            box_size=box_size,
-            border=border,
-        )
-        qr.add_data(qr_data)
-        qr.make(fit=True)
+                     error: int | None = None,
+                     border: int = 4) -> QRMatrix:
+        from qrcode.constants import ERROR_CORRECT_M
+        return _qr_matrix(qr_data, ERROR_CORRECT_M if error is None else error, border)
 
-        img = qr.make_image(fill_color=fill, back_color=back).convert("RGB")
+    def _draw_qr(self, canvas: c.Canvas | PillowCanvas, matrix: QRMatrix, x: float, y: float, size: float,
+                 fill: str = "black", back: str = "white") -> None:
+        if isinstance(canvas, PillowCanvas):
+            from PIL import Image, ImageColor
+            import numpy as np
+            modules = np.array(matrix, dtype=bool)[..., None]
+            pixels = np.where(modules, ImageColor.getrgb(fill)[:3], ImageColor.getrgb(back)[:3])
+            qr_image = Image.fromarray(pixels.astype(np.uint8), "RGB").resize(
+                (int(size), int(size)), Image.NEAREST)
+            self._draw_image(canvas, qr_image, x, y)
+            return
 
-        img = img.resize(size, Image.NEAREST)
-        return img
+        # Modules are vector rectangles so the code stays sharp at any resolution
+        module = size / len(matrix)
+        canvas.saveState()
+        canvas.setFillColor(back)
+        canvas.rect(x, y, size, size, stroke=0, fill=1)
+        canvas.setFillColor(fill)
+        path = canvas.beginPath()
+        for row, column, length in _qr_runs(matrix):
+            path.rect(x + column * module, y + size - (row + 1) * module,
+                      length * module, module)
+        canvas.drawPath(path, stroke=0, fill=1)
+        canvas.restoreState()
 
-    def _convert_image_to_bytes(self, image: Image.Image | Path) -> bytes:
-        if isinstance(image, Path):
-            img = image.resolve()
-            return img.read_bytes()
-        else:
-            buffer = BytesIO()
-            image.save(buffer, format="PNG")
-            return buffer.getvalue()
+    def _place_logo(self, canvas: c.Canvas | PillowCanvas, logo_image: Image.Image, qr_matrix: QRMatrix | None,
+                    logo_slot: tuple[int, int], assets_key: str | None = None):
+        c_width, _ = canvas._pagesize
+        dw, dh = logo_slot
+        dh = max(1, dh)
+        if qr_matrix:
+            # The QR code is a square as tall as the logo, placed to its left
+            dw = max(1, dw - dh)
+            self._draw_qr(canvas, qr_matrix, c_width - dw - dh, 0, dh)
+        _, resized_logo_image = self._resize_logo(logo_image, (dw, dh), assets_key)
 
-    def _place_logo(self, canvas: c.Canvas, logo_image: Image.Image, qr: str):
-        c_width, c_height = canvas._pagesize
-        if qr != "":
-            qr_image = self._generate_qr(qr, logo_image.size)
-            temp_canvas = Image.new(
-                "RGBA", ((logo_image.width*2), logo_image.height))
-            temp_canvas.paste(logo_image, (logo_image.width, 0))
-            temp_canvas.paste(qr_image, (0, 0))
-            logo_image = temp_canvas
-        if not self.place_bbox or not self.date_bbox:
-            desired_size = (c_width//5, int(c_height//5.4))
-        else:
-            x_space = c_width - 10 - \
-                int(max(self.date_bbox["x"] + self.date_bbox["width"],
-                    self.place_bbox["x"] + self.place_bbox["width"]))
-            inverse_ratio = logo_image.height/logo_image.width
-            y_space = self.place_bbox["height"] + self.place_bbox["y"]
-            if y_space/x_space < inverse_ratio:
-                x_space = int((1/inverse_ratio) * y_space)
+        self._draw_image(canvas, resized_logo_image, c_width - resized_logo_image.width,
+                         0, width=dw, height=dh)
 
-            y_space = x_space * inverse_ratio
-            desired_size = (x_space, int(y_space))
+    def _resize_logo(self, logo_image: Image.Image, size: tuple[int, int],
+                     assets_key: str | None = None) -> tuple[str | None, Image.Image]:
+        from PIL import ImageOps
+        if assets_key is None:
+            return None, ImageOps.cover(logo_image, size)
+        key = LayerCache.key("logo", assets_key, size)
+        resized_logo_image = layer_cache.get(key)
+        if resized_logo_image is None:
+            resized_logo_image = ImageOps.cover(logo_image, size)
+            layer_cache.put(key, resized_logo_image)
+        return key, resized_logo_image
 
-        dw, dh = desired_size
-        resized_logo_image = ImageOps.cover(logo_image, desired_size)
+    def _get_logo_slot(self, canvas_size: tuple[int, int], date_bbox: TextBox, place_bbox: TextBox,
+                       logo_size: tuple[int, int], has_qr: bool) -> tuple[int, int]:
+        c_width, c_height = canvas_size
+        logo_width, logo_height = logo_size
+        block_width = logo_width + (logo_height if has_qr else 0)
+        x_space = c_width - 10 - \
+            int(max(date_bbox.x + date_bbox.width,
+                place_bbox.x + place_bbox.width))
+        inverse_ratio = logo_height/block_width
+        y_space = place_bbox.height + place_bbox.y
+        # Text reaching the right edge leaves no width, the block then takes its width from the height below the text
+        if x_space <= 0 or y_space/x_space < inverse_ratio:
+            x_space = int((1/inverse_ratio) * y_space)
 
-        resized_logo_image_bytes = self._convert_image_to_bytes(
-            resized_logo_image)
-        buffer = BytesIO(resized_logo_image_bytes)
-        buffer.seek(0)
-        logo = ImageReader(buffer)
-        canvas.drawImage(logo, c_width - resized_logo_image.width,
-                         0, width=dw, height=dh, mask='auto')
+        y_space = x_space * inverse_ratio
+        return (x_space, int(y_space))
 
-    def _register_font(self, font_path: str | Path) -> str:
+    def _draw_image(self, canvas: c.Canvas | PillowCanvas, image: Image.Image | ImageReader, x: float, y: float,
+                    width: float | None = None, height: float | None = None) -> None:
+        if isinstance(canvas, PillowCanvas):
+            canvas.drawImage(image, x, y, width=width,
+                             height=height, mask='auto')
+            return
+        from reportlab.lib.utils import ImageReader
+        if not isinstance(image, ImageReader) and image.mode in ("P", "PA", "LA"):
+            # reportlab's mask='auto' can't read palette or LA transparency
+            image = image.convert("RGBA" if image.mode != "P" or "transparency" in image.info else "RGB")
+        # The decoded image goes to reportlab as is, it becomes one image XObject per distinct content
+        reader = image if isinstance(image, ImageReader) else ImageReader(image)
+        canvas.drawImage(reader, x, y, width=width, height=height, mask='auto')
 
-        font_path = Path(font_path)
-        font_name = font_path.stem.replace(' ', '_')
-        pdfmetrics.registerFont(TTFont(font_name, font_path.resolve()))
-        return font_name
+    def _register_font(self, font_path: str | Path) -> str:
+        return font_registry.get(font_path).name
 
-    def _write_with_box(self, canvas: c.Canvas, text: str, font_path: str | Path, text_pos: tuple[int, int],
+    def _write_with_box(self, canvas: c.Canvas | PillowCanvas, text: str, font_path: str | Path, text_pos: tuple[int, int],
                         color: str, font_size=20):
+        from reportlab.lib.colors import HexColor
         text = text.replace(r'\n', '\n')
-        font_name = self._register_font(font_path)
+        font = font_registry.get(font_path)
+        font_name = font.name
         lines = text.splitlines()
 
-        ascent = pdfmetrics.getAscent(font_name, font_size)
-        descent = pdfmetrics.getDescent(font_name, font_size)
+        ascent = font.get_ascent(font_size)
+        descent = font.get_descent(font_size)
         line_height_px = ascent - descent
 
         canvas.saveState()
@@ -165,73 +1002,203 @@ class PostMaker():
 
         canvas.restoreState()
 
-    def _get_bbox(self, text: str, font_path: str | Path, font_size: float, loc: tuple[float, float]) -> dict[str, float]:
+    def _get_bbox(self, text: str, font_path: str | Path, font_size: float, loc: tuple[float, float]) -> TextBox:
         ''' Always below descent amount of pixels of the specified location. You can use the same function with location (0,0) to find it out.'''
-        font_name = self._register_font(font_path)
+        font = font_registry.get(font_path)
         text = text.replace(r'\n', '\n')
         lines = text.splitlines()
         line_count = len(lines)
         x, y = loc
-        width = stringWidth(text, font_name, font_size)
-        ascent = pdfmetrics.getAscent(font_name, font_size)
-        descent = pdfmetrics.getDescent(font_name, font_size)
+        ascent = font.get_ascent(font_size)
+        descent = font.get_descent(font_size)
         line_height = ascent - descent
 
-        width = max(stringWidth(line, font_name, font_size) for line in lines)
+        width = max(font.string_width(line, font_size) for line in lines)
 
         height = line_count * line_height
 
         y += descent
-        return {
-            "x": x,
-            "y": y,
-            "width": width,
-            "height": height,
-            "ascent": ascent,
-            "descent": descent
-        }
-
-    def _write_event_info(self, canvas: c.Canvas, event_info: EventInformation, color_1: str, color_2: str, padding: tuple[int, int, int]):
+        return TextBox(x, y, width, height, ascent, descent)
+
+    def _layout(self, canvas_size: tuple[int, int], padding: tuple[int, int, int], event_info: EventInformation,
+                logo_size: tuple[int, int] | None, has_qr: bool) -> PosterLayout:
+        ''' Cached _compute_layout. Font files are part of the key so editing a font invalidates it.'''
+        key = (canvas_size, padding, logo_size, has_qr) + self._texts_key(event_info)
+        with _stage("layout") as details:
+            with _layouts_lock:
+                layout = _layouts.get(key)
+                if layout is not None:
+                    _layouts.move_to_end(key)
+            details["cache"] = "miss" if layout is None else "hit"
+            if layout is None:
+                layout = self._compute_layout(
+                    canvas_size, padding, event_info, logo_size, has_qr)
+                with _layouts_lock:
+                    _layouts[key] = layout
+                    if len(_layouts) > LAYOUT_CACHE_SIZE:
+                        _layouts.popitem(last=False)
+        return layout
+
+    def _texts_key(self, event_info: EventInformation) -> tuple:
+        texts = (event_info.title, event_info.desc,
+                 event_info.date, event_info.place)
+        fonts = tuple((metrics.path, metrics.mtime) for metrics in
+                      (font_registry.get(font) for _, font, _ in texts))
+        return texts, fonts
+
+    def _compute_layout(self, canvas_size: tuple[int, int], padding: tuple[int, int, int], event_info: EventInformation,
+                        logo_size: tuple[int, int] | None, has_qr: bool) -> PosterLayout:
         title, title_font, title_size = event_info.title
         place, place_font, place_size = event_info.place
         date, date_font, date_size = event_info.date
         desc, desc_font, desc_size = event_info.desc
-        _, canvas_height = canvas._pagesize
+        _, canvas_height = canvas_size
         x_padding, y_padding, text_padding = padding
         left_padding = x_padding
 
         # Title preloc
         title_bbox = self._get_bbox(title, title_font, title_size, (0, 0))
-        title_y = canvas_height - (y_padding + title_bbox["height"])
+        title_y = canvas_height - (y_padding + title_bbox.height)
         title_loc = (left_padding, title_y)
-        self.title_bbox = self._get_bbox(
+        title_bbox = self._get_bbox(
             title, title_font, title_size, title_loc)
 
         # Desc preloc
         description_bbox = self._get_bbox(desc, desc_font, desc_size, (0, 0))
-        desc_y = int(self.title_bbox["y"] -
-                     description_bbox["height"] - description_bbox["descent"] - text_padding)
+        desc_y = int(title_bbox.y -
+                     description_bbox.height - description_bbox.descent - text_padding)
         desc_loc = (left_padding, desc_y)
-        self.description_bbox = self._get_bbox(
+        description_bbox = self._get_bbox(
             desc, desc_font, desc_size, desc_loc)
 
         # Date preloc
         date_loc = (left_padding, y_padding)
-        self.date_bbox = self._get_bbox(date, date_font, date_size, date_loc)
+        date_bbox = self._get_bbox(date, date_font, date_size, date_loc)
 
         # Place preloc
         place_bbox = self._get_bbox(
             place, place_font, place_size, (0, 0))
         place_loc = (
-            left_padding, self.date_bbox["y"] + self.date_bbox["height"] - place_bbox["descent"] + text_padding)
-        self.place_bbox = self._get_bbox(
+            left_padding, date_bbox.y + date_bbox.height - place_bbox.descent + text_padding)
+        place_bbox = self._get_bbox(
             place, place_font, place_size, place_loc)
 
-        title_pos = (int(self.title_bbox["x"]), int(self.title_bbox["y"]))
-        desc_pos = (int(self.description_bbox["x"]), int(
-            self.description_bbox["y"]))
-        date_pos = (int(self.date_bbox["x"]), int(self.date_bbox["y"]))
-        place_pos = (int(self.place_bbox["x"]), int(self.place_bbox["y"]))
+        logo_slot = None
+        if logo_size:
+            logo_slot = self._get_logo_slot(
+                canvas_size, date_bbox, place_bbox, logo_size, has_qr)
+
+        return PosterLayout(title_bbox, description_bbox, date_bbox, place_bbox, logo_slot)
+
+    def _fit_event_info(self, canvas_size: tuple[int, int], padding: tuple[int, int, int],
+                        event_info: EventInformation, has_logo: bool) -> EventInformation:
+        ''' Cached _compute_fit, the fitted text doesn't depend on the colors.'''
+        key = (canvas_size, padding, has_logo) + self._texts_key(event_info)
+        with _stage("fit") as details:
+            with _fits_lock:
+                fitted = _fits.get(key)
+                if fitted is not None:
+                    _fits.move_to_end(key)
+            details["cache"] = "miss" if fitted is None else "hit"
+            if fitted is None:
+                fitted = self._compute_fit(canvas_size, padding, event_info, has_logo)
+                with _fits_lock:
+                    _fits[key] = fitted
+                    if len(_fits) > LAYOUT_CACHE_SIZE:
+                        _fits.popitem(last=False)
+        return fitted
+
+    def _compute_fit(self, canvas_size: tuple[int, int], padding: tuple[int, int, int],
+                     event_info: EventInformation, has_logo: bool) -> EventInformation:
+        ''' Wraps every field to the width it can use and finds the largest sizes, up to the given ones,
+        for which the title block and the bottom block stay within their share of the canvas.'''
+        canvas_width, canvas_height = canvas_size
+        x_padding, y_padding, text_padding = padding
+        width = canvas_width - x_padding - max(x_padding, text_padding)
+        bottom_width = width - (canvas_width * AUTO_FIT_LOGO_SHARE if has_logo else 0)
+
+        title, desc = self._fit_block([event_info.title, event_info.desc], width,
+                                      canvas_height * AUTO_FIT_TOP_SHARE, text_padding)
+        place, date = self._fit_block([event_info.place, event_info.date], bottom_width,
+                                      canvas_height * AUTO_FIT_BOTTOM_SHARE, text_padding)
+        return EventInformation(title=title, desc=desc, place=place, date=date)
+
+    def _fit_block(self, fields: list[tuple[str, str, int]], width: float, height: float,
+                   gap: float) -> list[tuple[str, str, int]]:
+        ''' Binary search for the largest scale of the field sizes whose wrapped lines fit width and,
+        stacked with gap between them, height. Word widths are measured once, in 1/1000 em, so every
+        step of the search is only additions.'''
+        fonts = [font_registry.get(font) for _, font, _ in fields]
+        paragraphs = [self._measure_words(text, font) for (text, _, _), font in zip(fields, fonts)]
+        spaces = [font.string_width(" ", 1000) for font in fonts]
+        largest = max(size for _, _, size in fields)
+
+        def _layout(step: int) -> tuple[list[tuple[str, str, int]], bool]:
+            fitted = []
+            fits = True
+            total_height = gap * (len(fields) - 1)
+            for (_, font_path, size), font, words, space in zip(fields, fonts, paragraphs, spaces):
+                font_size = max(MIN_FONT_SIZE, round(size * step / largest))
+                lines, widest = self._wrap(words, space, width * 1000 / font_size)
+                # A single word can still be too wide
+                fits = fits and widest * font_size / 1000 <= width
+                total_height += len(lines) * (font.get_ascent(font_size) - font.get_descent(font_size)) \
+                    - font.get_descent(font_size)
+                fitted.append(("\n".join(lines), font_path, font_size))
+            return fitted, fits and total_height <= height
+
+        low, high = 1, largest
+        best = None
+        while low <= high:
+            step = (low + high) // 2
+            fitted, fits = _layout(step)
+            if fits:
+                best = fitted
+                low = step + 1
+            else:
+                high = step - 1
+        # Nothing fits, the smallest sizes are the closest
+        return best or _layout(1)[0]
+
+    def _measure_words(self, text: str, font: FontMetrics) -> list[list[tuple[str, float]]]:
+        ''' Words of every line of text with their advance widths in 1/1000 em.'''
+        text = text.replace(r'\n', '\n')
+        return [[(word, font.string_width(word, 1000)) for word in line.split()]
+                for line in text.splitlines()]
+
+    def _wrap(self, paragraphs: list[list[tuple[str, float]]], space: float,
+              max_width: float) -> tuple[list[str], float]:
+        ''' Greedy line breaking, explicit line breaks are kept. Returns the lines and the widest one's width.'''
+        lines = []
+        widest = 0.0
+        for words in paragraphs:
+            if not words:
+                lines.append("")
+                continue
+            line, line_width = [words[0][0]], words[0][1]
+            for word, word_width in words[1:]:
+                if line_width + space + word_width <= max_width:
+                    line.append(word)
+                    line_width += space + word_width
+                else:
+                    lines.append(" ".join(line))
+                    widest = max(widest, line_width)
+                    line, line_width = [word], word_width
+            lines.append(" ".join(line))
+            widest = max(widest, line_width)
+        return lines, widest
+
+    def _write_event_info(self, canvas: c.Canvas | PillowCanvas, layout: PosterLayout, event_info: EventInformation,
+                          color_1: str, color_2: str):
+        title, title_font, title_size = event_info.title
+        place, place_font, place_size = event_info.place
+        date, date_font, date_size = event_info.date
+        desc, desc_font, desc_size = event_info.desc
+
+        title_pos = (int(layout.title.x), int(layout.title.y))
+        desc_pos = (int(layout.description.x), int(layout.description.y))
+        date_pos = (int(layout.date.x), int(layout.date.y))
+        place_pos = (int(layout.place.x), int(layout.place.y))
 
         # Title
         self._write_with_box(canvas, title, title_font,
@@ -246,47 +1213,85 @@ class PostMaker():
         self._write_with_box(canvas, date, date_font,
                              date_pos, color_2, font_size=date_size)
 
-    def _create_cubic_bezier(self, p1: float, p2: float, p3: float, p4: float) -> Callable[[float], float]:
-        return lambda t: p1*(1-t)**3 + t*3*p2*(1-t)**2 + (t**2)*p3*(1-t)*3 + p4*t**3
-
-    def _apply_gradient(self, canvas: c.Canvas, color: str, start: tuple[int, int], end: tuple[int, int]) -> None:
+    def _apply_gradient(self, canvas: c.Canvas | PillowCanvas, color: str, start: tuple[int, int], end: tuple[int, int],
+                        gradient: Gradient = Gradient.RASTER) -> None:
+        from PIL import ImageColor
         c_width, _ = canvas._pagesize
-        color_values = ImageColor.getrgb(color)
-        gradient_size = (c_width, max(
-            start[1], end[1]) - min(start[1], end[1]))
-
-        gradient_image = Image.new("RGBA", gradient_size)
-        draw = ImageDraw.Draw(gradient_image)
-
-        # TODO: convert to numpy
-        # chosen with https://cubic-bezier.com/
-        ease = self._create_cubic_bezier(0, .7, .9, 1)
-        for i in range(gradient_size[1]+1):
-            p = 1 - (i/gradient_size[1])
-            eased = ease(p)
-            alpha = int(255 * eased)
-            draw.line([(0, i), (c_width, i)], fill=(
-                color_values[0], color_values[1], color_values[2], alpha))
+        color_values = ImageColor.getrgb(color)[:3]
+        gradient_height = max(start[1], end[1]) - min(start[1], end[1])
+        if gradient_height <= 0:
+            return
 
         if start[1] > end[1]:
+            flip = False
             starty = end[1] + 2
         else:
-            gradient_image = gradient_image.rotate(180)
+            flip = True
             starty = start[1] - 2
 
-        gradient_image_bytes = self._convert_image_to_bytes(gradient_image)
-        buffer = BytesIO(gradient_image_bytes)
-        buffer.seek(0)
-        gradient = ImageReader(buffer)
-        canvas.drawImage(gradient, 0, starty, mask='auto')
+        with _stage("gradient", size=(c_width, gradient_height), mode=gradient.value) as details:
+            misses = _gradient_cache_misses()
+            if isinstance(canvas, PillowCanvas):
+                mask = _gradient_mask(
+                    (c_width, gradient_height), GRADIENT_EASE, flip)
+                canvas.drawGradient(color_values, mask, 0, starty)
+            elif gradient == Gradient.SHADING:
+                self._apply_shaded_gradient(
+                    canvas, color_values, (c_width, gradient_height), starty, flip)
+            else:
+                gradient_reader = _gradient_reader(
+                    color_values, (c_width, gradient_height), GRADIENT_EASE, flip)
+                self._draw_image(canvas, gradient_reader, 0, starty)
+            details["cache"] = "hit" if _gradient_cache_misses() == misses else "miss"
+
+    def _apply_shaded_gradient(self, canvas: c.Canvas, color: tuple[int, int, int], size: tuple[int, int],
+                               starty: int, flip: bool) -> None:
+        ''' Fills the gradient area with the color through a luminosity soft mask whose axial shading
+        follows the easing curve, so the PDF gets no image at all.'''
+        from reportlab.pdfbase.pdfdoc import (PDFArray, PDFAxialShading, PDFDictionary, PDFExponentialFunction,
+                                              PDFName, PDFStitchingFunction, PDFStream)
+        width, height = size
+        ease = _create_cubic_bezier(*GRADIENT_EASE)
+        stops = [i / SHADING_SEGMENTS for i in range(SHADING_SEGMENTS + 1)]
+        functions = [PDFExponentialFunction(C0=[ease(t0)], C1=[ease(t1)], N=1)
+                     for t0, t1 in zip(stops, stops[1:])]
+        function = PDFStitchingFunction(
+            functions, stops[1:-1], [0, 1] * SHADING_SEGMENTS, Domain=PDFArray([0, 1]))
+        # The raster gradient is opaque at the top unless it is flipped
+        y0, y1 = (starty + height, starty) if flip else (starty, starty + height)
+        shading = PDFAxialShading(0, y0, 0, y1, function, "DeviceGray",
+                                  Extend="[false false]")
 
-    def _place_elements(self, canvas: c.Canvas, bg_color_hex: str, fg_color_hex: str,
-                        event_information: EventInformation, qr: str,
-                        padding: tuple[int, int, int], bg_image: Path | None = None, logo_image: Path | None = None) -> c.Canvas:
+        doc = canvas._doc
+        group = PDFStream(content="/Sh0 sh")
+        group.dictionary["Type"] = PDFName("XObject")
+        group.dictionary["Subtype"] = PDFName("Form")
+        group.dictionary["BBox"] = PDFArray([0, starty, width, starty + height])
+        group.dictionary["Group"] = PDFDictionary(
+            {"S": PDFName("Transparency"), "CS": PDFName("DeviceGray")})
+        group.dictionary["Resources"] = PDFDictionary(
+            {"Shading": PDFDictionary({"Sh0": doc.Reference(shading)})})
+        soft_mask = PDFDictionary({"Type": PDFName("Mask"), "S": PDFName("Luminosity"),
+                                   "G": doc.Reference(group)})
+
+        # reportlab has no API for soft masks, so register the graphics state the same way setFillAlpha does
+        states = canvas._extgstate._c
+        state_name = 'gRLs' + str(len(states))
+        states[("SMask", doc.Reference(soft_mask))] = state_name
+
+        canvas.saveState()
+        canvas._code.append(f"/{state_name} gs")
+        canvas.setFillColorRGB(*(value / 255 for value in color))
+        canvas.rect(0, starty, width, height, stroke=0, fill=1)
+        canvas.restoreState()
 
+    def _draw_base(self, canvas: c.Canvas | PillowCanvas, bg_color_hex: str, fg_color_hex: str,
+                   assets: PosterAssets, padding: tuple[int, int, int], options: RenderOptions = RenderOptions()) -> None:
+        ''' Everything under the text: background image, color bands and gradients.'''
+        from reportlab.lib.colors import HexColor
         canvas_width, canvas_height = canvas._pagesize
-        if bg_image:
-            self._place_bg_image(canvas, bg_image, padding)
+        if assets.has_background:
+            self._place_bg_image(canvas, assets, padding, options.max_memory)
 
         # Draw rectangle over background image
         rect_size = (canvas_width, padding[1])
@@ -308,22 +1313,355 @@ class PostMaker():
         fade_length = int(canvas_height*0.6)
 
         self._apply_gradient(canvas, fg_color_hex,
-                             lower_space, (0, canvas_height - fade_length))
+                             lower_space, (0, canvas_height - fade_length), options.gradient)
         self._apply_gradient(canvas, bg_color_hex,
-                             upper_space, (0, fade_length))
+                             upper_space, (0, fade_length), options.gradient)
 
-        self._write_event_info(canvas, event_information,
-                               bg_color_hex, fg_color_hex, padding)
+    def _place_elements(self, canvas: c.Canvas | PillowCanvas, bg_color_hex: str, fg_color_hex: str,
+                        event_information: EventInformation, assets: PosterAssets,
+                        padding: tuple[int, int, int], options: RenderOptions = RenderOptions()) -> c.Canvas | PillowCanvas:
 
-        if logo_image:
-            logo = Image.open(logo_image)
-            self._place_logo(canvas, logo, qr)
+        if isinstance(canvas, PillowCanvas):
+            # Only the text depends on the event information, everything under it is one cached layer
+            key = LayerCache.key("base", canvas._pagesize, padding, bg_color_hex, fg_color_hex,
+                                 options.gradient.value, self._background_key(assets))
+            with _stage("base") as details:
+                base = layer_cache.get(key)
+                details["cache"] = "miss" if base is None else "hit"
+                if base is None:
+                    self._draw_base(canvas, bg_color_hex, fg_color_hex, assets, padding, options)
+                    layer_cache.put(key, canvas.image.copy())
+                else:
+                    canvas.image.paste(base)
+        else:
+            self._draw_base(canvas, bg_color_hex, fg_color_hex, assets, padding, options)
+
+        if options.text_fit == TextFit.AUTO:
+            event_information = self._fit_event_info(
+                canvas._pagesize, padding, event_information, assets.logo is not None)
+        layout = self._layout(canvas._pagesize, padding, event_information,
+                              assets.logo.size if assets.logo else None, assets.qr is not None)
+        with _stage("text"):
+            self._write_event_info(canvas, layout, event_information,
+                                   bg_color_hex, fg_color_hex)
+
+        if assets.logo:
+            with _stage("logo", size=layout.logo_slot, qr=assets.qr is not None):
+                if assets.logo_key is None:
+                    assets.logo_key = _image_digest(assets.logo)
+                self._place_logo(canvas, assets.logo, assets.qr, layout.logo_slot, assets.logo_key)
 
         return canvas
 
+    def _load_assets(self, bg_image: Path | BinaryIO | None, logo_image: Path | BinaryIO | None, qr: str) -> PosterAssets:
+        from PIL import Image
+        assets = PosterAssets()
+        with _stage("load") as details:
+            if bg_image and not isinstance(bg_image, (str, Path)):
+                # File-like objects (e.g. Streamlit uploads) can't be reopened later, the compressed bytes are
+                # kept and decoded at the size the canvases need
+                assets.background_data = bg_image.read()
+                with Image.open(BytesIO(assets.background_data)) as image:
+                    assets.background_format = image.format
+                    assets.background_size = image.size
+                details["background"] = assets.background_size
+            elif bg_image:
+                # Opening only reads the header
+                with Image.open(bg_image) as image:
+                    assets.background_path = Path(bg_image)
+                    assets.background_format = image.format
+                    assets.background_size = image.size
+                details["background"] = assets.background_size
+            if logo_image:
+                with Image.open(logo_image) as image:
+                    assets.logo = image.copy()
+                details["logo"] = assets.logo.size
+                if qr != "":
+                    assets.qr = self._generate_qr(qr)
+        return assets
+
+    def _open_reduced(self, image_file: Path | BinaryIO, size: tuple[int, int], cover: bool = True,
+                      max_memory: int | None = None) -> Image.Image:
+        ''' Decodes only as much as needed for the image to cover (or fit in) size. JPEGs are decoded at reduced
+        scale. Raises MemoryError instead of decoding more than max_memory bytes of pixels.'''
+        from PIL import Image
+        image = Image.open(image_file)
+        try:
+            ratios = (size[0] / image.width, size[1] / image.height)
+            scale = min(1, max(ratios) if cover else min(ratios))
+            target = (max(1, ceil(image.width * scale)),
+                      max(1, ceil(image.height * scale)))
+            # Nothing is decoded yet, draft only picks the JPEG scale load() will decode at
+            image.draft(image.mode, target)
+            if max_memory is not None and _image_bytes(image) > max_memory:
+                raise MemoryError(f"Resmi açmak için {_image_bytes(image) / 2**20:.0f} MB bellek gerekiyor, "
+                                  f"sınır {max_memory / 2**20:.0f} MB.")
+            # Loading closes the file, no copy is needed to keep the pixels
+            image.load()
+        except BaseException:
+            image.close()
+            raise
+        if image.size == target:
+            return image
+        return image.resize(target, Image.LANCZOS, reducing_gap=2.0)
+
+    def _load_preview_assets(self, bg_image: Path | None, logo_image: Path | None, qr: str,
+                             size: tuple[int, int]) -> PosterAssets:
+        ''' Assets downsampled to the preview canvas, cached until the files change.'''
+        key = (size, qr,
+               (str(bg_image), bg_image.stat().st_mtime_ns) if bg_image else None,
+               (str(logo_image), logo_image.stat().st_mtime_ns) if logo_image else None)
+        with _preview_assets_lock:
+            assets = _preview_assets.get(key)
+            if assets is not None:
+                _preview_assets.move_to_end(key)
+                return assets
+
+        assets = PosterAssets()
+        if bg_image:
+            assets.background = self._open_reduced(bg_image, size)
+        if logo_image:
+            assets.logo = self._open_reduced(logo_image, size, cover=False)
+            if qr != "":
+                assets.qr = self._generate_qr(qr)
+        with _preview_assets_lock:
+            _preview_assets[key] = assets
+            if len(_preview_assets) > PREVIEW_ASSETS_CACHE_SIZE:
+                _preview_assets.popitem(last=False)
+        return assets
+
+    def preview(self, canvas_type: Posts | PostInformation, bg_color_hex: str, fg_color_hex: str,
+                event_information: EventInformation, qr: str,
+                bg_image: Path | None = None, logo_image: Path | None = None,
+                scale: float = PREVIEW_SCALE, text_fit: TextFit = TextFit.FIXED) -> Image.Image:
+        ''' Low resolution Pillow render for live previews. Everything, fonts included, is scaled down.'''
+        if isinstance(canvas_type, Posts):
+            canvas_type = canvas_type.value
+        if text_fit == TextFit.AUTO:
+            # Fitted at full size, so the preview breaks lines where the final poster does
+            event_information = self._fit_event_info((canvas_type.width, canvas_type.height),
+                                                     self._get_padding(canvas_type), event_information,
+                                                     logo_image is not None)
+        info = PostInformation(
+            width=max(1, round(canvas_type.width * scale)),
+            height=max(1, round(canvas_type.height * scale)),
+            text_padding=round(canvas_type.text_padding * scale),
+            x_padding=round(canvas_type.x_padding * scale),
+            y_padding=round(canvas_type.y_padding * scale))
+
+        def _scaled(text: tuple[str, str, int]) -> tuple[str, str, float]:
+            content, font, size = text
+            return (content, font, size * scale)
+        event_information = EventInformation(
+            title=_scaled(event_information.title),
+            desc=_scaled(event_information.desc),
+            place=_scaled(event_information.place),
+            date=_scaled(event_information.date))
+
+        size = (info.width, info.height)
+        assets = self._load_preview_assets(bg_image, logo_image, qr, size)
+        canvas = PillowCanvas(size)
+        self._place_elements(canvas, bg_color_hex, fg_color_hex, event_information,
+                             assets, self._get_padding(info))
+        return canvas.image
+
     def create(self, canvas_type: Posts | PostInformation, bg_color_hex: str, fg_color_hex: str,
                event_information: EventInformation, qr: str,
-               bg_image: Path | None = None, logo_image: Path | None = None, savedir: str = ".") -> None:
+               bg_image: Path | None = None, logo_image: Path | None = None, savedir: str = ".",
+               backend: Backend = Backend.PDF, gradient: Gradient = Gradient.RASTER,
+               output: OutputOptions = OutputOptions(), text_fit: TextFit = TextFit.FIXED,
+               max_memory: int | None = None) -> None:
+
+        assets = self._load_assets(bg_image, logo_image, qr)
+        self._render(canvas_type, bg_color_hex, fg_color_hex,
+                     event_information, assets, savedir, RenderOptions(backend, gradient, output, text_fit, max_memory))
+
+    def create_all(self, canvas_types: list[Posts | PostInformation], bg_color_hex: str, fg_color_hex: str,
+                   event_information: EventInformation, qr: str,
+                   bg_image: Path | None = None, logo_image: Path | None = None, savedir: str = ".",
+                   backend: Backend = Backend.PDF, workers: int | None = None,
+                   gradient: Gradient = Gradient.RASTER,
+                   output: OutputOptions = OutputOptions(), text_fit: TextFit = TextFit.FIXED,
+                   max_memory: int | None = None) -> list[RenderResult]:
+        ''' Renders every canvas type of the same event. Assets are decoded once and the variants are
+        rendered in parallel, one process per core unless workers is given.'''
+        from concurrent.futures import ProcessPoolExecutor
+        assets = self._load_assets(bg_image, logo_image, qr)
+        options = RenderOptions(backend, gradient, output, text_fit, max_memory)
+        # Decode once here instead of once per worker
+        self._prepare_background(assets, [info for _, info, _ in self._get_variants(canvas_types)], options)
+
+        tracer = _tracer.get()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(assets,)) as executor:
+            futures = [executor.submit(_render_variant, name, info, label, bg_color_hex, fg_color_hex,
+                                       event_information, savedir, options, tracer is not None)
+                       for name, info, label in self._get_variants(canvas_types)]
+            results = [future.result() for future in futures]
+        self._emit_worker_events(results)
+        return results
+
+    def create_matrix(self, canvas_types: list[Posts | PostInformation], colors: list[tuple[str, str]],
+                      event_informations: list[EventInformation], qr: str,
+                      bg_image: Path | None = None, logo_image: Path | None = None, savedir: str = ".",
+                      backend: Backend = Backend.PDF, workers: int | None = None,
+                      gradient: Gradient = Gradient.RASTER,
+                      output: OutputOptions = OutputOptions(), text_fit: TextFit = TextFit.FIXED,
+                      max_memory: int | None = None) -> list[RenderResult]:
+        ''' Renders every canvas type in every (background, foreground) color pair for every text variant.
+        What doesn't depend on the colors is done once here and handed to the workers: the fitted
+        background of every canvas size, the fitted text and layouts, the resized logos. A worker renders
+        all texts of one canvas and color pair, so the pillow base layer is drawn once per pair.'''
+        from concurrent.futures import ProcessPoolExecutor
+        assets = self._load_assets(bg_image, logo_image, qr)
+        options = RenderOptions(backend, gradient, output, text_fit, max_memory)
+        variants = self._get_variants(canvas_types)
+        colors = [color for index, color in enumerate(colors) if color not in colors[:index]]
+        texts = [text for index, text in enumerate(event_informations) if text not in event_informations[:index]]
+
+        layers: dict[str, Image.Image] = {}
+        with _stage("shared", variants=len(variants), colors=len(colors), texts=len(texts)):
+            self._prepare_background(assets, [info for _, info, _ in variants], options)
+            if assets.logo and assets.logo_key is None:
+                assets.logo_key = _image_digest(assets.logo)
+            for _, info, _ in variants:
+                canvas_size = (info.width, info.height)
+                padding = self._get_padding(info)
+                background_size = (info.width, info.height - 2 * info.y_padding)
+                if assets.has_background and not (
+                        backend == Backend.PDF and self._can_pass_through(assets, background_size)):
+                    key, image = self._fit_background(assets, background_size, max_memory=max_memory)
+                    layers[key] = image
+                for text in texts:
+                    try:
+                        if text_fit == TextFit.AUTO:
+                            text = self._fit_event_info(canvas_size, padding, text, assets.logo is not None)
+                        layout = self._layout(canvas_size, padding, text,
+                                              assets.logo.size if assets.logo else None, assets.qr is not None)
+                        if assets.logo:
+                            # Same size as in _place_logo, the QR code takes a square from the slot
+                            width, height = layout.logo_slot
+                            key, image = self._resize_logo(assets.logo, (width - height if assets.qr else width,
+                                                                         height), assets.logo_key)
+                            layers[key] = image
+                    except Exception:
+                        # The worker runs into it again and reports it for this variant
+                        continue
+        with _layouts_lock:
+            layouts = dict(_layouts)
+        with _fits_lock:
+            fits = dict(_fits)
+        if assets.background_path or assets.background_data:
+            # The workers get the fitted layers, they only decode the file again if those are evicted
+            assets = replace(assets, background=None)
+
+        # Only add what tells the files apart to their names
+        names = [self._create_file_name("", text) for text in texts]
+        groups = []
+        for name, info, label in variants:
+            for bg_color_hex, fg_color_hex in colors:
+                group = []
+                for index, text in enumerate(texts):
+                    variant, file_label = name, label
+                    if len(colors) > 1:
+                        variant += f" {bg_color_hex}/{fg_color_hex}"
+                        file_label += f"_{bg_color_hex}_{fg_color_hex}"
+                    if len(texts) > 1:
+                        variant += f" {index + 1}"
+                        if names.count(names[index]) > 1:
+                            file_label += f"_{index + 1}"
+                    group.append((variant, info, file_label, bg_color_hex, fg_color_hex, text))
+                groups.append(group)
+
+        tracer = _tracer.get()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(assets, layers, layouts, fits)) as executor:
+            futures = [executor.submit(_render_group, group, savedir, options, tracer is not None)
+                       for group in groups]
+            results = [result for future in futures for result in future.result()]
+        self._emit_worker_events(results)
+        return results
+
+    def _emit_worker_events(self, results: list[RenderResult]) -> None:
+        tracer = _tracer.get()
+        if tracer:
+            for result in results:
+                for event in result.events:
+                    event.details["variant"] = result.variant
+                    tracer.emit(event)
+
+    def create_document(self, canvas_types: list[Posts | PostInformation], bg_color_hex: str, fg_color_hex: str,
+                        event_information: EventInformation, qr: str,
+                        bg_image: Path | None = None, logo_image: Path | None = None, savedir: str = ".",
+                        gradient: Gradient = Gradient.RASTER, output: OutputOptions = OutputOptions(),
+                        thread_count: int = 1, text_fit: TextFit = TextFit.FIXED,
+                        max_memory: int | None = None) -> list[RenderResult]:
+        ''' Renders every canvas type as a page of a single PDF, built in memory and rasterized with one
+        pdf2image call. Images shared by the pages (background JPEG, gradients) are embedded once.'''
+        from PIL import Image
+        from reportlab.pdfgen import canvas as c
+        assets = self._load_assets(bg_image, logo_image, qr)
+        options = RenderOptions(Backend.PDF, gradient, output, text_fit, max_memory)
+        savedir = Path(savedir).resolve()
+        canvas = c.Canvas(BytesIO(), pdfVersion=(1, 4))
+
+        pages: list[tuple[str, PostInformation, str, float]] = []
+        results: dict[str, RenderResult] = {}
+        for name, info, label in self._get_variants(canvas_types):
+            start = perf_counter()
+            canvas.setPageSize((info.width, info.height))
+            try:
+                with _stage("render", size=(info.width, info.height), backend=Backend.PDF.value, variant=name):
+                    self._place_elements(canvas, bg_color_hex, fg_color_hex, event_information,
+                                         assets, self._get_padding(info), options)
+            except Exception as e:
+                # Throw away whatever was drawn, the next variant starts on a clean page
+                canvas._restartAccumulators()
+                canvas.init_graphics_state()
+                canvas.state_stack = []
+                results[name] = RenderResult(name, None, perf_counter() - start, str(e))
+                continue
+            canvas.showPage()
+            pages.append((name, info, label, perf_counter() - start))
+
+        if pages:
+            with _stage("save") as details:
+                pdf = canvas.getpdfdata()
+                details["bytes"] = len(pdf)
+            (savedir / f"{self._create_file_name('all', event_information)}.pdf").write_bytes(pdf)
+            with _stage("poppler", pages=len(pages)):
+                # Pages are sized in points, at 72 DPI every page comes out at its own pixel size
+                images = convert_from_bytes(pdf, dpi=72, thread_count=thread_count)
+            for (name, info, label, seconds), image in zip(pages, images):
+                start = perf_counter()
+                size = (info.width, info.height)
+                if image.size != size:
+                    image = image.resize(size, Image.LANCZOS)
+                file_name = str(savedir / self._create_file_name(label, event_information))
+                Path(f"{file_name}.{output.format.extension}").write_bytes(self._encode(image, output))
+                results[name] = RenderResult(name, file_name, seconds + perf_counter() - start,
+                                             peak_memory=peak_memory())
+
+        return [results[name] for name, _, _ in self._get_variants(canvas_types)]
+
+    def _get_variants(self, canvas_types: list[Posts | PostInformation]) -> list[tuple[str, PostInformation, str]]:
+        ''' Returns (variant name, canvas information, file name label) for every distinct canvas type.'''
+        # Equal PostInformation values (e.g. IG_STORY and FB_STORY) are rendered once
+        variants: list[tuple[str, PostInformation]] = []
+        for canvas_type in canvas_types:
+            info = canvas_type.value if isinstance(canvas_type, Posts) else canvas_type
+            if all(info != other for _, other in variants):
+                name = canvas_type.name if isinstance(
+                    canvas_type, Posts) else f"{info.width}x{info.height}"
+                variants.append((name, info))
+
+        # Different variants with the same size would otherwise write to the same file
+        sizes = [f"{info.width}x{info.height}" for _, info in variants]
+        return [(name, info, size if sizes.count(size) == 1 else f"{size}_{name}")
+                for size, (name, info) in zip(sizes, variants)]
+
+    def _render(self, canvas_type: Posts | PostInformation, bg_color_hex: str, fg_color_hex: str,
+                event_information: EventInformation, assets: PosterAssets, savedir: str = ".",
+                options: RenderOptions = RenderOptions(), label: str | None = None) -> str:
 
         # TODO: Check validity of hex code
         if isinstance(canvas_type, Posts):
@@ -331,28 +1669,259 @@ class PostMaker():
         canvas_height = canvas_type.height
         canvas_width = canvas_type.width
         file_name = self._create_file_name(
-            f"{canvas_width}x{canvas_height}", event_information)
+            label or f"{canvas_width}x{canvas_height}", event_information)
         file_name = str(Path(savedir).resolve()/file_name)
 
-        # TODO: fix this
-        canvas = c.Canvas(
-            f"{file_name}.pdf", pagesize=(canvas_width, canvas_height), pdfVersion=(1, 4))
+        size = (canvas_width, canvas_height)
+        with _stage("render", size=size, backend=options.backend.value) as details:
+            data = self._draw_bytes(canvas_type, bg_color_hex, fg_color_hex, event_information, assets, options)
+            self.save_image(data, file_name, size, options)
+            details["peak_memory"] = peak_memory()
+        return file_name
 
-        padding = self._get_padding(canvas_type)
+    async def create_async(self, canvas_type: Posts | PostInformation, bg_color_hex: str, fg_color_hex: str,
+                           event_information: EventInformation, qr: str,
+                           bg_image: Path | BinaryIO | None = None, logo_image: Path | BinaryIO | None = None,
+                           savedir: str = ".", backend: Backend = Backend.PDF, gradient: Gradient = Gradient.RASTER,
+                           output: OutputOptions = OutputOptions(), text_fit: TextFit = TextFit.FIXED,
+                           max_memory: int | None = None, executor: Executor | None = None,
+                           limit: asyncio.Semaphore | None = None) -> str:
+        ''' Same as create, without blocking the event loop. Loading, drawing and encoding run on executor (a
+        shared thread pool when not given), poppler runs as an asyncio subprocess. With limit, only as many
+        renders as the semaphore allows run at once. Cancelling kills poppler and removes the files written
+        so far. Returns the file name without extension.
+        reportlab holds the GIL while drawing, a ProcessPoolExecutor keeps the loop responsive under load.'''
+        if isinstance(canvas_type, Posts):
+            canvas_type = canvas_type.value
+        options = RenderOptions(backend, gradient, output, text_fit, max_memory)
+        size = (canvas_type.width, canvas_type.height)
+        file_name = str(Path(savedir).resolve() / self._create_file_name(
+            f"{canvas_type.width}x{canvas_type.height}", event_information))
+        written: list[Path] = []
+
+        async with limit or nullcontext():
+            try:
+                with _stage("render", size=size, backend=backend.value):
+                    assets = await _run_in(executor, self._load_assets, bg_image, logo_image, qr)
+                    data = await _run_in(executor, self._draw_bytes, canvas_type, bg_color_hex, fg_color_hex,
+                                         event_information, assets, options)
+                    if backend == Backend.PDF:
+                        pdf_file = Path(f"{file_name}.pdf")
+                        written.append(pdf_file)
+                        await _run_in(executor, pdf_file.write_bytes, data)
+                        with _stage("poppler", size=size):
+                            ppm = await _pdftoppm(pdf_file, size)
+                        data = await _run_in(executor, self._encode_ppm, ppm, output)
+                    image_file = Path(f"{file_name}.{output.format.extension}")
+                    written.append(image_file)
+                    await _run_in(executor, image_file.write_bytes, data)
+            except BaseException:
+                for path in written:
+                    path.unlink(missing_ok=True)
+                raise
+        return file_name
+
+    def _draw_bytes(self, canvas_type: PostInformation, bg_color_hex: str, fg_color_hex: str,
+                    event_information: EventInformation, assets: PosterAssets,
+                    options: RenderOptions = RenderOptions()) -> bytes:
+        ''' Draws the poster, returns the encoded image with the pillow backend and the PDF otherwise.'''
+        size = (canvas_type.width, canvas_type.height)
+        if options.backend == Backend.PILLOW:
+            canvas = PillowCanvas(size)
+        else:
+            from reportlab.pdfgen import canvas as c
+            canvas = c.Canvas(BytesIO(), pagesize=size, pdfVersion=(1, 4))
+        canvas = self._place_elements(canvas, bg_color_hex, fg_color_hex, event_information,
+                                      assets, self._get_padding(canvas_type), options)
+        if isinstance(canvas, PillowCanvas):
+            return self._encode(canvas.image, options.output)
+        return self._save_pdf(canvas)
+
+    def _save_pdf(self, canvas: c.Canvas) -> bytes:
+        with _stage("save") as details:
+            pdf = canvas.getpdfdata()
+            details["bytes"] = len(pdf)
+        return pdf
+
+    def _encode_ppm(self, ppm: bytes, output: OutputOptions = OutputOptions()) -> bytes:
+        from PIL import Image
+        with Image.open(BytesIO(ppm)) as image:
+            return self._encode(image, output)
+
+    def render(self, canvas_type: Posts | PostInformation, bg_color_hex: str, fg_color_hex: str,
+               event_information: EventInformation, qr: str,
+               bg_image: Path | BinaryIO | None = None, logo_image: Path | BinaryIO | None = None,
+               backend: Backend = Backend.PDF, gradient: Gradient = Gradient.RASTER,
+               output: OutputOptions = OutputOptions(), text_fit: TextFit = TextFit.FIXED,
+               max_memory: int | None = None) -> RenderedPoster:
+        ''' Same as create, but returns the image (and PDF) contents instead of writing files.'''
+        assets = self._load_assets(bg_image, logo_image, qr)
+        return self._render_bytes(canvas_type, bg_color_hex, fg_color_hex,
+                                  event_information, assets, RenderOptions(backend, gradient, output, text_fit, max_memory))
 
-        canvas = self._place_elements(canvas, bg_color_hex, fg_color_hex,
-                                      event_information, qr, padding, bg_image, logo_image)
+    def _render_bytes(self, canvas_type: Posts | PostInformation, bg_color_hex: str, fg_color_hex: str,
+                      event_information: EventInformation, assets: PosterAssets,
+                      options: RenderOptions = RenderOptions()) -> RenderedPoster:
+        if isinstance(canvas_type, Posts):
+            canvas_type = canvas_type.value
+        size = (canvas_type.width, canvas_type.height)
+        file_name = self._create_file_name(
+            f"{canvas_type.width}x{canvas_type.height}", event_information)
+
+        with _stage("render", size=size, backend=options.backend.value):
+            data = self._draw_bytes(canvas_type, bg_color_hex, fg_color_hex, event_information, assets, options)
+            output = options.output
+            if options.backend == Backend.PILLOW:
+                return RenderedPoster(file_name, data, format=output.format)
+            with _stage("poppler", size=size):
+                image = convert_from_bytes(data, dpi=300, size=size)[0]
+            return RenderedPoster(file_name, self._encode(image, output), data, output.format)
 
-        self.save_image(canvas, file_name, (canvas_width, canvas_height))
+    def _encode(self, image: Image.Image, output: OutputOptions = OutputOptions()) -> bytes:
+        with _stage("encode", format=output.format.value) as details:
+            quality = output.quality or DEFAULT_QUALITY
+            data = self._encode_with(image, output, quality)
+            if output.max_bytes and len(data) > output.max_bytes:
+                if output.format == ImageFormat.PNG:
+                    # Lossless, the only thing left to try is the strongest compression
+                    data = min(data, self._encode_with(image, output, quality, compress_level=9), key=len)
+                else:
+                    data, quality = self._fit_quality(image, output, quality)
+            details.update(quality=None if output.format == ImageFormat.PNG else quality, bytes=len(data),
+                           budget_met=len(data) <= output.max_bytes if output.max_bytes else None)
+        return data
+
+    def _fit_quality(self, image: Image.Image, output: OutputOptions, quality: int) -> tuple[bytes, int]:
+        ''' Binary search for the highest quality whose encoding fits in output.max_bytes.
+        Returns the MIN_QUALITY encoding if nothing fits.'''
+        low, high = MIN_QUALITY, quality - 1
+        best = None
+        while low <= high:
+            middle = (low + high) // 2
+            data = self._encode_with(image, output, middle)
+            if len(data) <= output.max_bytes:
+                best = (data, middle)
+                low = middle + 1
+            else:
+                high = middle - 1
+        return best or (self._encode_with(image, output, MIN_QUALITY), MIN_QUALITY)
+
+    def _encode_with(self, image: Image.Image, output: OutputOptions, quality: int,
+                     compress_level: int | None = None) -> bytes:
+        compress_level = compress_level if compress_level is not None else output.compress_level
+        buffer = BytesIO()
+        if output.format == ImageFormat.PNG:
+            image.save(buffer, "PNG", compress_level=compress_level if compress_level is not None
+                       else 1 if output.fast else 6)
+        elif output.format == ImageFormat.JPEG:
+            # Huffman table optimization costs a second pass over the data
+            image.convert("RGB").save(buffer, "JPEG", quality=quality, optimize=not output.fast)
+        else:
+            image.save(buffer, "WEBP", quality=quality, method=compress_level if compress_level is not None
+                       else 0 if output.fast else 4)
+        return buffer.getvalue()
 
     def _create_file_name(self, canvas_type: str, even_information: EventInformation) -> str:
         def _safer(s: str):
             return re.sub(r'[^A-Za-z0-9.._-]', '_', s)
         return f"{_safer(even_information.title[0])}_{_safer(even_information.date[0])}_{_safer(canvas_type)}"
 
-    def save_image(self, canvas: c.Canvas, file_name: str | Path, size: tuple[int, int]) -> None:
-        canvas.save()
-        if not isinstance(file_name, Path):
-            file_name = Path(file_name)
-        images = convert_from_path(f"{file_name}.pdf", dpi=300, size=size)
-        images[0].save(f"{file_name}.png", "PNG")
+    def save_image(self, data: bytes, file_name: str | Path, size: tuple[int, int],
+                   options: RenderOptions = RenderOptions()) -> None:
+        ''' Writes what _draw_bytes returned. With the PDF backend that is the PDF, the image is rendered from it.'''
+        if options.backend == Backend.PDF:
+            Path(f"{file_name}.pdf").write_bytes(data)
+            with _stage("poppler", size=size):
+                image = convert_from_path(f"{file_name}.pdf", dpi=300, size=size)[0]
+            data = self._encode(image, options.output)
+        Path(f"{file_name}.{options.output.format.extension}").write_bytes(data)
+
+
+_worker_postmaker: PostMaker | None = None
+_worker_assets: PosterAssets | None = None
+
+
+def _init_worker(assets: PosterAssets, layers: dict[str, Image.Image] | None = None,
+                 layouts: dict[tuple, PosterLayout] | None = None,
+                 fits: dict[tuple, EventInformation] | None = None) -> None:
+    global _worker_postmaker, _worker_assets
+    _worker_postmaker = PostMaker()
+    _worker_assets = assets
+    # Work the parent already did for every variant
+    for key, layer in (layers or {}).items():
+        layer_cache.put(key, layer)
+    _layouts.update(layouts or {})
+    _fits.update(fits or {})
+
+
+def _render_variant(variant: str, canvas_type: PostInformation, label: str, bg_color_hex: str, fg_color_hex: str,
+                    event_information: EventInformation, savedir: str, options: RenderOptions,
+                    trace: bool = False) -> RenderResult:
+    start = perf_counter()
+    # The parent's tracer doesn't exist in this process, the events are sent back with the result
+    tracer = Tracer()
+    try:
+        with tracer if trace else nullcontext():
+            file_name = _worker_postmaker._render(canvas_type, bg_color_hex, fg_color_hex,
+                                                  event_information, _worker_assets, savedir, options, label)
+    except Exception as e:
+        return RenderResult(variant, None, perf_counter() - start, str(e), tracer.events, peak_memory())
+    return RenderResult(variant, file_name, perf_counter() - start, events=tracer.events, peak_memory=peak_memory())
+
+
+def _render_group(jobs: list[tuple[str, PostInformation, str, str, str, EventInformation]], savedir: str,
+                  options: RenderOptions, trace: bool = False) -> list[RenderResult]:
+    ''' Renders (variant, canvas type, label, background color, foreground color, event information) jobs
+    one after the other in the same worker, so they share its caches.'''
+    return [_render_variant(*job, savedir, options, trace) for job in jobs]
+
+
+_async_executor: Executor | None = None
+_async_executor_lock = Lock()
+
+
+def _get_async_executor() -> Executor:
+    global _async_executor
+    with _async_executor_lock:
+        if _async_executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            _async_executor = ThreadPoolExecutor(thread_name_prefix="postermaker")
+        return _async_executor
+
+
+async def _run_in(executor: Executor | None, func: Callable, *args):
+    ''' Runs func on executor. If the caller is cancelled while func runs, waits for it to finish before
+    passing the cancellation on, so nothing writes a file after the caller has cleaned up.'''
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+    executor = executor or _get_async_executor()
+    if isinstance(executor, ThreadPoolExecutor):
+        # Threads see the caller's tracer, a context can't be sent to another process
+        future = executor.submit(copy_context().run, func, *args)
+    else:
+        future = executor.submit(func, *args)
+    try:
+        return await asyncio.wrap_future(future)
+    except asyncio.CancelledError:
+        if not future.cancel():
+            await asyncio.wait([asyncio.wrap_future(future)])
+        raise
+
+
+async def _pdftoppm(pdf_file: Path, size: tuple[int, int]) -> bytes:
+    ''' The first page as PPM, rendered the way convert_from_path(pdf_file, dpi=300, size=size) does.
+    Cancelling kills poppler.'''
+    import asyncio
+    process = await asyncio.create_subprocess_exec(
+        "pdftoppm", "-r", "300", "-f", "1", "-l", "1", "-singlefile",
+        "-scale-to-x", str(size[0]), "-scale-to-y", str(size[1]), str(pdf_file),
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+    try:
+        stdout, stderr = await process.communicate()
+    except asyncio.CancelledError:
+        process.kill()
+        await process.wait()
+        raise
+    if process.returncode != 0:
+        raise RuntimeError(f"pdftoppm hata verdi ({process.returncode}): {stderr.decode(errors='replace').strip()}")
+    return stdout
@@ -0,0 +1,174 @@
+import hashlib
+import os
+from argparse import ArgumentParser, Namespace
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from io import BytesIO
+from pathlib import Path
+from threading import BoundedSemaphore
+from time import perf_counter
+from flask import Flask, Response, jsonify, request
+from batch import row_to_args
+from main import check_fonts, get_max_memory, get_output_options
+from postermakerClass import EventInformation, PostInformation, Posts, Backend, Gradient, PosterAssets, RenderOptions, RenderedPoster, TextFit, font_index, FONTS_DIRECTORY
+import worker
+
+# Form fields use the same names as main.py's long options, files are sent as "background" and "logo"
+UPLOAD_FIELDS = ("background", "logo")
+
+
+def _get_assets(background: bytes | None, logo: bytes | None, qr: str) -> PosterAssets:
+    ''' Uploads are keyed by content, so the same logo sent by every request is decoded once per worker.'''
+    key = tuple(hashlib.sha256(data).digest() if data else None for data in (background, logo)) + (qr,)
+    return worker.get_assets(key, BytesIO(background) if background else None,
+                             BytesIO(logo) if logo else None, qr)
+
+
+def _render_request(args: Namespace, canvas_type: Posts | PostInformation,
+                    background: bytes | None, logo: bytes | None) -> RenderedPoster:
+    event_information = EventInformation(
+        title=(args.title, args.title_font, args.title_size),
+        desc=(args.description, args.description_font, args.description_size),
+        date=(args.date, args.date_font, args.date_size),
+        place=(args.place, args.place_font, args.place_size),
+    )
+    assets = _get_assets(background, logo, args.qr)
+    return worker.postmaker._render_bytes(canvas_type, args.bgcolor, args.fgcolor, event_information, assets,
+                                           RenderOptions(Backend(args.backend), Gradient(args.gradient),
+                                                         get_output_options(args), TextFit(args.text_fit),
+                                                         get_max_memory(args)))
+
+
+def get_canvas_type(args: Namespace) -> Posts | PostInformation:
+    if args.width and args.height:
+        return PostInformation(args.width, args.height, args.text_padding, args.xpadding, args.ypadding)
+    if args.canvas:
+        return Posts[args.canvas]
+    raise ValueError("canvas ya da width ve height girilmeli.")
+
+
+def _error(message: str, status: int) -> Response:
+    response = jsonify({"error": message})
+    response.status_code = status
+    return response
+
+
+def create_app(workers: int | None = None, queue_size: int = 8, timeout: float = 30,
+               fonts: list[str] | None = None, fonts_directory: str | Path = FONTS_DIRECTORY) -> Flask:
+    ''' fonts are parsed by every worker at start, font fields can be files or names of fonts in fonts_directory.'''
+    app = Flask(__name__)
+    max_workers = workers or os.cpu_count() or 1
+    executor = ProcessPoolExecutor(max_workers=max_workers, initializer=worker.init_worker, initargs=(fonts or [],))
+    # Start every worker now instead of on the first requests
+    for future in [executor.submit(worker.ping) for _ in range(max_workers)]:
+        future.result()
+    # Running renders plus the ones waiting for a worker
+    slots = BoundedSemaphore(max_workers + queue_size)
+
+    @app.post("/render")
+    def render():
+        try:
+            args = check_fonts(row_to_args(request.form.to_dict()), fonts_directory)
+            canvas_type = get_canvas_type(args)
+            Backend(args.backend)
+            Gradient(args.gradient)
+            TextFit(args.text_fit)
+            # "pdf" returns the PDF, the raster image is encoded as png in that case
+            send_pdf = args.format == "pdf"
+            if send_pdf:
+                args.format = "png"
+            get_output_options(args)
+        except (KeyError, ValueError) as e:
+            return _error(f"Geçersiz istek: {e}", 400)
+        if send_pdf and Backend(args.backend) == Backend.PILLOW:
+            return _error("'pillow' altyapısı PDF üretmez.", 400)
+        uploads = [request.files[field].read() if field in request.files else None
+                   for field in UPLOAD_FIELDS]
+
+        if not slots.acquire(blocking=False):
+            response = _error("Sıra dolu, daha sonra tekrar deneyin.", 429)
+            response.headers["Retry-After"] = "1"
+            return response
+        start = perf_counter()
+        try:
+            future = executor.submit(_render_request, args, canvas_type, *uploads)
+        except Exception:
+            slots.release()
+            raise
+        # The slot is freed when the render really ends, a timed out render still holds its worker
+        future.add_done_callback(lambda _: slots.release())
+        try:
+            poster = future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            return _error(f"{timeout} saniyede tamamlanamadı.", 504)
+        except MemoryError as e:
+            return _error(str(e), 413)
+        except Exception as e:
+            return _error(str(e), 500)
+
+        if send_pdf:
+            data, mimetype, extension = poster.pdf, "application/pdf", "pdf"
+        else:
+            data, mimetype, extension = poster.image, poster.format.mimetype, poster.format.extension
+        return Response(data, mimetype=mimetype, headers={
+            "Content-Disposition": f'attachment; filename="{poster.file_name}.{extension}"',
+            "X-Render-Seconds": f"{perf_counter() - start:.3f}",
+        })
+
+    @app.get("/health")
+    def health():
+        return jsonify({"status": "ok"})
+
+    return app
+
+
+def main(args: Namespace):
+    fonts = []
+    for info in font_index(args.fonts).scan():
+        if info.valid:
+            fonts.append(info.path)
+        else:
+            print(f"{Path(info.path).name} yüklenmedi: {info.error}")
+    app = create_app(args.workers, args.queue, args.timeout, fonts, args.fonts)
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Post hazırlayıcı için yerel HTTP servisi.")
+    parser.add_argument(
+        "--host",
+        type=str,
+        default="127.0.0.1",
+        help="Dinlenecek adres"
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=5000,
+        help="Dinlenecek port"
+    )
+    parser.add_argument(
+        "--workers", "-j",
+        type=int,
+        help="Kullanılacak işlemci sayısı. Varsayılan: çekirdek sayısı"
+    )
+    parser.add_argument(
+        "--queue", "-q",
+        type=int,
+        default=8,
+        help="Boş işlemci bekleyebilecek en fazla istek sayısı. Fazlası 429 ile reddedilir."
+    )
+    parser.add_argument(
+        "--timeout", "-t",
+        type=float,
+        default=30,
+        help="Bir isteğin en fazla bekleyeceği süre (sn). Aşılırsa 504 döner."
+    )
+    parser.add_argument(
+        "--fonts", "-f",
+        type=str,
+        default=FONTS_DIRECTORY,
+        help="Başlangıçta yüklenecek fontların bulunduğu klasör"
+    )
+    args = parser.parse_args()
+    main(args)
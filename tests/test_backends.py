@@ -0,0 +1,59 @@
+''' The Pillow backend has to look like the PDF backend rasterized by poppler. Needs poppler's pdftoppm.'''
+import shutil
+from io import BytesIO
+from pathlib import Path
+import numpy as np
+import pytest
+import reportlab
+from PIL import Image
+from postermakerClass import Backend, EventInformation, PostMaker, Posts
+
+# Mean absolute difference per channel, out of 255. Text and resampling differ slightly between the two.
+MAX_MEAN_DIFF = 3.0
+FONT = str(Path(reportlab.__file__).parent / "fonts" / "Vera.ttf")
+
+pytestmark = pytest.mark.skipif(shutil.which("pdftoppm") is None, reason="poppler is not installed")
+
+
+def _logo(mode: str) -> Image.Image:
+    ''' A blue square on a transparent background, in the given mode.'''
+    logo = Image.new("RGBA", (400, 300), (0, 0, 0, 0))
+    logo.paste((40, 90, 200, 255), (100, 75, 300, 225))
+    if mode == "LA":
+        return logo.convert("LA")
+    if mode == "P":
+        palette = Image.new("P", (400, 300), 0)
+        palette.putpalette([0, 0, 0, 40, 90, 200])
+        palette.paste(1, (100, 75, 300, 225))
+        palette.info["transparency"] = 0
+        return palette
+    return logo
+
+
+@pytest.fixture
+def background(tmp_path: Path) -> Path:
+    rng = np.random.default_rng(0)
+    small = rng.integers(0, 256, (16, 12, 3), dtype=np.uint8)
+    path = tmp_path / "background.jpg"
+    Image.fromarray(small).resize((1200, 1600), Image.BICUBIC).save(path, quality=90)
+    return path
+
+
+def _render(backend: Backend, background: Path, logo: Path, qr: str) -> np.ndarray:
+    event_information = EventInformation(title=("Kodlama Gecesi", FONT, 100), desc=("Herkes davetli", FONT, 54),
+                                         date=("12 Mart 19:00", FONT, 60), place=("B Blok", FONT, 75))
+    poster = PostMaker().render(Posts.IG_POST, "#ffffff", "#eb4034", event_information, qr,
+                                background, logo, backend=backend)
+    return np.asarray(Image.open(BytesIO(poster.image)).convert("RGB"), dtype=np.float32)
+
+
+@pytest.mark.parametrize("logo_mode", ["RGBA", "LA", "P"])
+@pytest.mark.parametrize("qr", ["", "https://example.com/etkinlik"])
+def test_pillow_matches_pdf(tmp_path: Path, background: Path, logo_mode: str, qr: str):
+    logo = tmp_path / "logo.png"
+    _logo(logo_mode).save(logo)
+
+    pdf = _render(Backend.PDF, background, logo, qr)
+    pillow = _render(Backend.PILLOW, background, logo, qr)
+    assert pdf.shape == pillow.shape
+    assert np.abs(pdf - pillow).mean() < MAX_MEAN_DIFF
@@ -0,0 +1,137 @@
+''' Uploaded images stored under the hash of their contents. The same image uploaded twice is kept once, a new
+image with a reused file name never replaces the old one, and downscaled copies for previews and renders are
+made once when the image is stored.'''
+import hashlib
+import os
+import re
+from math import ceil
+from pathlib import Path
+from threading import Lock, get_ident
+from time import time
+from typing import BinaryIO
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Short side of the downscaled copies. A copy covers any canvas whose long side is at most its short side, so
+# previews use the small one and most renders the large one.
+DERIVATIVE_SIZES = (1024, 4096)
+UPLOAD_STORE_BYTES = 1024 * 1024 * 1024
+UPLOAD_MAX_AGE = 7 * 24 * 60 * 60
+# Only files named like this are the store's, anything else in the directory is left alone
+_STORED_NAME = re.compile(r"^([0-9a-f]{64})(?:_\d+)?$")
+
+
+class UploadStore():
+    ''' Files are named by the sha256 of the upload, copies by the hash and their short side. Both never change
+    once written, so paths are safe cache keys. Files unused for max_age seconds are removed, then the least
+    recently used ones until the store fits in max_bytes.'''
+
+    def __init__(self, directory: str | Path, max_bytes: int = UPLOAD_STORE_BYTES, max_age: float = UPLOAD_MAX_AGE):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        # Last use of each hash in this process. Touching the files would change their mtime, which the
+        # renderer's caches use as part of their keys.
+        self._used: dict[str, float] = {}
+        self._lock = Lock()
+
+    def put(self, file: BinaryIO) -> str:
+        ''' Stores the contents of file and returns their hash. Written in chunks while hashing, an image that is
+        already stored is not written again.'''
+        sha = hashlib.sha256()
+        temporary = self.directory / f".upload.{os.getpid()}.{get_ident()}"
+        file.seek(0)
+        try:
+            with open(temporary, "wb") as f:
+                while chunk := file.read(UPLOAD_CHUNK_SIZE):
+                    sha.update(chunk)
+                    f.write(chunk)
+            digest = sha.hexdigest()
+            path = self.directory / digest
+            if path.exists():
+                temporary.unlink()
+            else:
+                os.replace(temporary, path)
+                self._make_derivatives(digest, path)
+        except BaseException:
+            temporary.unlink(missing_ok=True)
+            raise
+        self._used[digest] = time()
+        self.evict(keep=digest)
+        return digest
+
+    def get(self, digest: str, size: float = 0) -> Path | None:
+        ''' The smallest copy whose short side is at least size, the original when no copy is large enough.
+        None when the image was evicted.'''
+        self._used[digest] = time()
+        original = self.directory / digest
+        if not original.exists():
+            return None
+        for derivative_size in DERIVATIVE_SIZES:
+            path = self.directory / f"{digest}_{derivative_size}"
+            if derivative_size >= size and path.exists():
+                return path
+        return original
+
+    def evict(self, keep: str | None = None) -> int:
+        ''' Removes old and least recently used images, never keep. An image goes with its copies, a copy left
+        without its original would make the image look stored. Returns how many files were removed.'''
+        now = time()
+        with self._lock:
+            images: dict[str, list] = {}
+            for path in self.directory.iterdir():
+                match = _STORED_NAME.match(path.name)
+                if match is None:
+                    continue
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                digest = match.group(1)
+                image = images.setdefault(digest, [self._used.get(digest, 0), 0, []])
+                image[0] = max(image[0], stat.st_mtime)
+                image[1] += stat.st_size
+                image[2].append(path)
+            total = sum(size for _, size, _ in images.values())
+            removed = 0
+            for digest, (used, size, paths) in sorted(images.items(), key=lambda item: item[1][0]):
+                if now - used <= self.max_age and total <= self.max_bytes:
+                    break
+                if digest == keep:
+                    continue
+                # The original last, an interrupted eviction leaves an original get() can still serve
+                for path in sorted(paths, key=lambda path: path.name == digest):
+                    path.unlink(missing_ok=True)
+                self._used.pop(digest, None)
+                total -= size
+                removed += len(paths)
+            return removed
+
+    def _make_derivatives(self, digest: str, path: Path) -> None:
+        from PIL import Image
+        temporary = self.directory / f".derivative.{os.getpid()}.{get_ident()}"
+        try:
+            with Image.open(path) as image:
+                image_format = image.format
+                sizes = sorted((size for size in DERIVATIVE_SIZES if size < min(image.size)), reverse=True)
+                if not sizes:
+                    return
+                scale = sizes[0] / min(image.size)
+                # JPEGs are decoded at reduced scale, just above the largest copy
+                image.draft(image.mode, (ceil(image.width * scale), ceil(image.height * scale)))
+                image.load()
+                if image.mode not in ("RGB", "RGBA", "L", "LA", "CMYK"):
+                    image = image.convert("RGBA")
+                # Each copy is resized from the previous, larger one
+                for size in sizes:
+                    scale = size / min(image.size)
+                    image = image.resize((ceil(image.width * scale), ceil(image.height * scale)),
+                                         Image.LANCZOS, reducing_gap=2.0)
+                    if image_format == "JPEG":
+                        image.save(temporary, "JPEG", quality=95)
+                    else:
+                        image.save(temporary, "PNG", compress_level=1)
+                    os.replace(temporary, self.directory / f"{digest}_{size}")
+        except Exception:
+            # Not an image Pillow can resize, renders use the original and report the error there
+            temporary.unlink(missing_ok=True)
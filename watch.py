@@ -0,0 +1,180 @@
+''' --watch mode of main.py. Renders once, then re-renders only the canvases whose inputs changed each time
+the spec file, the images or the fonts are saved.'''
+import hashlib
+import json
+from argparse import Namespace
+from pathlib import Path
+from queue import Empty, Queue
+from time import perf_counter
+from watchdog.events import FileSystemEvent, FileSystemEventHandler
+from watchdog.observers import Observer
+from main import check_fonts, check_image, get_canvas_types, get_max_memory, get_output_options, load_spec
+from postermakerClass import PostMaker, EventInformation, Backend, Gradient, PosterAssets, RenderOptions, TextFit, Tracer
+
+# Editors save in several steps (write a temporary file, rename it over the old one), events closer than
+# this are one save
+DEBOUNCE_SECONDS = 0.3
+FILE_OPTIONS = ("background", "logo", "title_font", "description_font", "date_font", "place_font")
+# Options that don't change what a canvas looks like. The canvas size and paddings are part of the variant.
+IGNORED_OPTIONS = ("workers", "watch", "spec", "profile", "canvas", "width", "height", "xpadding", "ypadding",
+                   "text_padding")
+
+
+class _ChangeHandler(FileSystemEventHandler):
+    ''' Puts the watched paths that were written, created, moved or deleted on the queue.'''
+
+    def __init__(self, queue: Queue):
+        self.queue = queue
+        self.paths: set[str] = set()
+
+    def on_any_event(self, event: FileSystemEvent) -> None:
+        if event.is_directory or event.event_type in ("opened", "closed_no_write"):
+            return
+        # Atomic saves write a temporary file and move it to the watched path
+        for path in (event.src_path, getattr(event, "dest_path", "")):
+            if path and str(Path(path).resolve()) in self.paths:
+                self.queue.put(str(Path(path).resolve()))
+
+
+class Watcher():
+    ''' Keeps the fingerprint of every rendered canvas. A canvas is rendered again only when its fingerprint
+    changes, so saving the logo re-renders every canvas while resizing a custom canvas renders only that one.
+    Renders run in this process, the layer, layout and fit caches stay warm between saves.'''
+
+    def __init__(self, args: Namespace):
+        self.args = args
+        self.postmaker = PostMaker()
+        self._fingerprints: dict[str, str] = {}
+        self._digests: dict[str, tuple[tuple[int, int], str | None]] = {}
+        self._inputs: dict[str, str | None] = {}
+        self._assets: tuple[tuple, PosterAssets] | None = None
+
+    def _digest(self, path: str) -> str | None:
+        ''' Content hash of the file, a save that doesn't change the content renders nothing.'''
+        try:
+            stat = Path(path).stat()
+        except OSError:
+            return None
+        cached = self._digests.get(path)
+        if cached and cached[0] == (stat.st_mtime_ns, stat.st_size):
+            return cached[1]
+        digest = hashlib.sha256(Path(path).read_bytes()).hexdigest()
+        self._digests[path] = ((stat.st_mtime_ns, stat.st_size), digest)
+        return digest
+
+    def _load_args(self) -> Namespace:
+        args = load_spec(self.args) if self.args.spec else self.args
+        if args.colors or args.texts or args.single_pdf:
+            raise ValueError("--watch, --colors, --texts ve --single_pdf ile birlikte kullanılamaz.")
+        return check_fonts(args)
+
+    def watched_paths(self) -> set[str]:
+        args = self.args
+        try:
+            args = self._load_args()
+        except Exception:
+            # The spec is still watched, fixing it brings the rest back
+            pass
+        paths = [args.spec] + [getattr(args, option) for option in FILE_OPTIONS]
+        return {str(Path(path).resolve()) for path in paths if path}
+
+    def _get_assets(self, args: Namespace, inputs: dict[str, str | None]) -> PosterAssets:
+        key = (inputs.get("background"), inputs.get("logo"), args.qr)
+        if self._assets is None or self._assets[0] != key:
+            background = Path(args.background) if args.background else None
+            logo = Path(args.logo) if args.logo else None
+            if background:
+                check_image(background, "Arkaplan için girilen dosya bir resim değil!")
+            if logo:
+                check_image(logo, "Logo için girilen dosya bir resim değil!")
+            self._assets = (key, self.postmaker._load_assets(background, logo, args.qr))
+        return self._assets[1]
+
+    def update(self) -> None:
+        ''' Renders the canvases whose fingerprint changed since the last update.'''
+        args = self._load_args()
+        inputs = {option: self._digest(getattr(args, option)) if getattr(args, option) else None
+                  for option in FILE_OPTIONS}
+        changed = [option for option in FILE_OPTIONS if self._inputs and inputs[option] != self._inputs.get(option)]
+        self._inputs = inputs
+        settings = json.dumps({key: value for key, value in sorted(vars(args).items())
+                               if key not in IGNORED_OPTIONS and key not in FILE_OPTIONS}, default=str)
+
+        pending = []
+        fingerprints = {}
+        for name, info, label in self.postmaker._get_variants(get_canvas_types(args)):
+            fingerprint = hashlib.sha256(f"{settings}{sorted(inputs.items())}{info}{label}".encode()).hexdigest()
+            fingerprints[name] = fingerprint
+            if self._fingerprints.get(name) != fingerprint:
+                pending.append((name, info, label))
+        if not pending:
+            print("Değişiklik postları etkilemiyor.")
+            return
+        if changed:
+            print(f"Değişenler: {', '.join(changed)}")
+
+        event_information = EventInformation(
+            title=(args.title, args.title_font, args.title_size),
+            desc=(args.description, args.description_font, args.description_size),
+            date=(args.date, args.date_font, args.date_size),
+            place=(args.place, args.place_font, args.place_size),
+        )
+        assets = self._get_assets(args, inputs)
+        options = RenderOptions(Backend(args.backend), Gradient(args.gradient), get_output_options(args),
+                                TextFit(args.text_fit), get_max_memory(args))
+        Path(args.savedir).mkdir(parents=True, exist_ok=True)
+        for name, info, label in pending:
+            start = perf_counter()
+            with Tracer() as tracer:
+                file_name = self.postmaker._render(info, args.bgcolor, args.fgcolor, event_information, assets,
+                                                   args.savedir, options, label)
+            cached = [event.stage for event in tracer.events if event.details.get("cache") == "hit"]
+            print(f"{name}: {file_name} ({perf_counter() - start:.2f} sn"
+                  f"{', önbellekten: ' + ', '.join(cached) if cached else ''})")
+            # Only a canvas that rendered is up to date, a failed one is tried again on the next save
+            self._fingerprints[name] = fingerprints[name]
+
+
+def _wait_for_changes(queue: Queue) -> set[str]:
+    ''' Blocks until a watched file changes, then until no change came for DEBOUNCE_SECONDS.'''
+    paths = {queue.get()}
+    while True:
+        try:
+            paths.add(queue.get(timeout=DEBOUNCE_SECONDS))
+        except Empty:
+            return paths
+
+
+def _schedule(observer: Observer, handler: _ChangeHandler, paths: set[str]) -> None:
+    handler.paths = paths
+    observer.unschedule_all()
+    for directory in sorted({str(Path(path).parent) for path in paths}):
+        if Path(directory).is_dir():
+            observer.schedule(handler, directory, recursive=False)
+
+
+def watch(args: Namespace) -> None:
+    watcher = Watcher(args)
+    queue: Queue = Queue()
+    handler = _ChangeHandler(queue)
+    observer = Observer()
+    _schedule(observer, handler, watcher.watched_paths())
+    observer.start()
+    try:
+        while True:
+            try:
+                watcher.update()
+            except Exception as e:
+                print(f"HATA: {e}")
+            print("Değişiklikler bekleniyor... (çıkmak için Ctrl+C)")
+            changed = _wait_for_changes(queue)
+            print(f"Değişti: {', '.join(sorted(Path(path).name for path in changed))}")
+            # The spec may now point at other images or fonts
+            paths = watcher.watched_paths()
+            if paths != handler.paths:
+                _schedule(observer, handler, paths)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        observer.stop()
+        observer.join()
@@ -0,0 +1,37 @@
+''' State of the render worker processes started by batch.py and server.py. Each worker keeps one PostMaker, the
+fonts it was started with and the last few loaded assets, so a logo used by every row or request is decoded once.'''
+from pathlib import Path
+from typing import BinaryIO
+from postermakerClass import PostMaker, PosterAssets, font_registry
+
+ASSET_CACHE_SIZE = 8
+
+postmaker: PostMaker | None = None
+_assets: dict[tuple, PosterAssets] = {}
+
+
+def init_worker(fonts: list[str]) -> None:
+    ''' ProcessPoolExecutor initializer. Parses the fonts up front, the renders using a broken one report the error.'''
+    global postmaker
+    postmaker = PostMaker()
+    for font in fonts:
+        try:
+            font_registry.get(font)
+        except Exception:
+            pass
+
+
+def ping() -> None:
+    return
+
+
+def get_assets(key: tuple, background: Path | BinaryIO | None, logo: Path | BinaryIO | None,
+               qr: str) -> PosterAssets:
+    ''' The assets loaded from background, logo and qr, reused while key is among the last ASSET_CACHE_SIZE keys.'''
+    assets = _assets.get(key)
+    if assets is None:
+        assets = postmaker._load_assets(background, logo, qr)
+        if len(_assets) >= ASSET_CACHE_SIZE:
+            _assets.pop(next(iter(_assets)))
+        _assets[key] = assets
+    return assets